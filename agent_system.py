@@ -3,19 +3,41 @@ from langchain_groq import ChatGroq
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.tools import Tool
 from tools import get_tools
-from verification import ClaimTracker
+from http_pool import get_http_client
+from circuit_breaker import get_breaker
+from run_context import RunContext, agent_scope, current_run, run_scope
+from structured_claims import make_record_claims_tool
+from budget import BudgetExhausted, BudgetCallbackHandler, current_budget, usage_tokens
+from verification import ClaimTracker, claim_sources
 import os
+import threading
 import time
+import uuid
+from contextlib import nullcontext
+
+GROQ_HOST = "api.groq.com"
+
+# Below these many seconds of budget an agent drops its tools, then stops calling the LLM
+MIN_TOOL_SECONDS = 20
+MIN_LLM_SECONDS = 5
+
+# In order of preference; run() moves down the list while a model's circuit is open
+MODELS_TO_TRY = ["llama3-8b-8192", "llama3-70b-8192", "mixtral-8x7b-32768"]
 
 class ResearchAgent:
     def __init__(self, agent_type, groq_api_key):
         self.agent_type = agent_type
+        self.groq_api_key = groq_api_key
         
         
-        models_to_try = ["llama3-8b-8192", "llama3-70b-8192", "mixtral-8x7b-32768"]
-        
         self.llm = None
-        for model in models_to_try:
+        self.model_breaker = None
+        self.model_lock = threading.Lock()
+        for model in MODELS_TO_TRY:
+            breaker = get_breaker(f"model:{model}")
+            if not breaker.allow_request():
+                print(f" Skipping model {model}: circuit open")
+                continue
             try:
                 self.llm = ChatGroq(
                     temperature=0.1,
@@ -23,13 +45,19 @@ class ResearchAgent:
                     api_key=groq_api_key,
                     timeout=60, 
                     max_retries=3,  
-                    request_timeout=30
+                    request_timeout=30,
+                    http_client=get_http_client(GROQ_HOST)
                 )
                 
                 test_response = self.llm.invoke("Hello")
+                breaker.record_success()
+                self.model_breaker = breaker
+                self.model_name = model
                 print(f" Successfully initialized with model: {model}")
                 break
             except Exception as e:
+                breaker.record_failure(e)
+                self.llm = None
                 print(f" Failed to initialize model {model}: {str(e)}")
                 continue
         
@@ -81,6 +109,21 @@ class ResearchAgent:
                 ("placeholder", "{agent_scratchpad}")
             ])
         
+        # Structured mode: the researcher hands claims over through a tool call instead of prose
+        self.structured_prompt = None
+        self.structured_tools = self.tools
+        if agent_type == "researcher":
+            self.structured_tools = self.tools + [make_record_claims_tool(self.claim_tracker)]
+            self.structured_prompt = ChatPromptTemplate.from_messages([
+                ("system", """You are a senior technical researcher. Gather comprehensive information about the user's query.
+                - Use the available tools to research thoroughly
+                - Record every key claim with the record_claims tool: subject, the attribute compared, a short value, and a source URL when you have one
+                - Include recent developments (2023-2024)
+                - After recording the claims, reply with a brief summary only; do not restate the claims or build tables"""),
+                ("human", "{input}"),
+                ("placeholder", "{agent_scratchpad}")
+            ])
+        
       
         try:
             self.agent = create_tool_calling_agent(self.llm, self.tools, self.prompt)
@@ -121,7 +164,93 @@ class ResearchAgent:
                 continue
         return converted_tools
     
-    def run(self, input_data, max_retries=3):
+    def _select_model(self):
+        """Keep the current model while its circuit allows requests, else switch to the
+        next model in MODELS_TO_TRY whose circuit does. False when every circuit is open."""
+        with self.model_lock:
+            if self.model_breaker.allow_request():
+                return True
+            for model in MODELS_TO_TRY:
+                if model == self.model_name:
+                    continue
+                breaker = get_breaker(f"model:{model}")
+                if not breaker.allow_request():
+                    continue
+                print(f"🔀 {self.agent_type}: {self.model_name} circuit open, switching to {model}")
+                self.model_name = model
+                self.model_breaker = breaker
+                self.llm = ChatGroq(
+                    temperature=0.1,
+                    model=model,
+                    api_key=self.groq_api_key,
+                    timeout=60,
+                    max_retries=3,
+                    request_timeout=30,
+                    http_client=get_http_client(GROQ_HOST)
+                )
+                if self.executor is not None:
+                    self.agent = create_tool_calling_agent(self.llm, self.tools, self.prompt)
+                    self.executor = AgentExecutor(
+                        agent=self.agent,
+                        tools=self.tools,
+                        verbose=False,
+                        handle_parsing_errors=True,
+                        max_iterations=5,
+                        max_execution_time=120
+                    )
+                return True
+            return False
+    
+    def _llm_for(self, timeout):
+        """Fresh client for one budgeted call; construction is cheap on the pooled connection"""
+        budget = current_budget()
+        remaining_tokens = budget.remaining_tokens() if budget is not None else float("inf")
+        return ChatGroq(
+            temperature=0.1,
+            model=self.model_name,
+            api_key=self.groq_api_key,
+            timeout=timeout,
+            max_retries=0,
+            max_tokens=None if remaining_tokens == float("inf") else max(1, min(int(remaining_tokens), 4096)),
+            http_client=get_http_client(GROQ_HOST)
+        )
+    
+    def _executor_for(self, deadline, max_iterations=None, structured=False):
+        """The shared executor, or a per-call one whose timeouts and tool budget fit the call"""
+        if deadline is None and max_iterations is None and not structured:
+            return self.executor
+        tools = self.structured_tools if structured else self.tools
+        prompt = self.structured_prompt if structured else self.prompt
+        if structured:
+            # One extra step for the record_claims call
+            max_iterations = (max_iterations or 5) + 1
+        if deadline is None:
+            agent = self.agent if not structured else create_tool_calling_agent(self.llm, tools, prompt)
+            execution_time = 120
+        else:
+            remaining = deadline - time.monotonic()
+            llm_timeout = min(30, remaining / 2)
+            agent = create_tool_calling_agent(self._llm_for(llm_timeout), tools, prompt)
+            execution_time = max(1, min(120, remaining - llm_timeout))
+        return AgentExecutor(
+            agent=agent,
+            tools=tools,
+            verbose=False,
+            handle_parsing_errors=True,
+            max_iterations=max_iterations or 5,
+            max_execution_time=execution_time
+        )
+    
+    @staticmethod
+    def _can_wait(deadline, seconds):
+        """Whether sleeping `seconds` still leaves room for another LLM call"""
+        return deadline is None or time.monotonic() + seconds + MIN_LLM_SECONDS < deadline
+    
+    def _budget_skipped(self):
+        return f"⏱️ {self.agent_type.capitalize()} step skipped: the run's time or token budget is exhausted."
+    
+    def run(self, input_data, max_retries=3, run_id=None, time_limit=None, max_iterations=None,
+            structured=False):
         
         
        
@@ -131,9 +260,36 @@ class ResearchAgent:
             input_data = {"input": str(input_data)}
         
        
+        # The one breaker admission for this call: in HALF_OPEN every allow_request()
+        # takes a probe slot, so everything below reuses this decision
+        if not self._select_model():
+            return self._model_unavailable()
+        
+        budget = current_budget()
+        deadline = None
+        if budget is not None:
+            available = budget.remaining_seconds()
+            if time_limit is not None:
+                available = min(available, time_limit)
+            deadline = time.monotonic() + available
+            if budget.exhausted() or available < MIN_LLM_SECONDS:
+                return self._budget_skipped()
+            if available < MIN_TOOL_SECONDS:
+                print(f"⏱️ {self.agent_type} has {available:.0f}s left, answering without tools")
+                return self._fallback_run(input_data["input"], deadline)
+        
         if not self.executor:
-            return self._fallback_run(input_data["input"])
+            return self._fallback_run(input_data["input"], deadline)
         
+        structured = structured and self.structured_prompt is not None
+        # record_claims reports into the run context; make one if the caller has none
+        scope = run_scope(RunContext(run_id)) if structured and current_run() is None else nullcontext()
+        with scope:
+            return self._run_executor(input_data, max_retries, run_id, deadline, budget,
+                                      max_iterations, structured)
+    
+    def _run_executor(self, input_data, max_retries, run_id, deadline, budget, max_iterations, structured):
+        """Executor attempts with retry/backoff, falling back to a direct LLM call"""
         last_error = None
         for attempt in range(max_retries):
             try:
@@ -141,15 +297,28 @@ class ResearchAgent:
                 
                
                 if attempt > 0:
+                    if not self._can_wait(deadline, 2 ** attempt):
+                        break
                     time.sleep(2 ** attempt) 
                 
-                result = self.executor.invoke(input_data)
+                executor = self._executor_for(deadline, max_iterations, structured)
+                config = {"callbacks": [BudgetCallbackHandler(budget)]} if budget is not None else None
+                # Each executor invocation has its own scratchpad, so its own dedup scope
+                scope_name = f"{self.agent_type}:{uuid.uuid4().hex[:8]}"
+                with agent_scope(scope_name):
+                    result = executor.invoke(input_data, config=config)
+                self.model_breaker.record_success()
                 
                
-                if self.agent_type == "researcher" and result.get("output"):
+                structured_claims = current_run().structured_claims if structured else []
+                if self.agent_type == "researcher" and result.get("output") and not structured_claims:
                     try:
                         claims = self.claim_tracker.extract_claims(result["output"])
-                        self.claim_tracker.add_claims(claims, "Researcher Agent")
+                        # Attribute claims to the sources this invocation's tools actually returned
+                        run = current_run()
+                        tool_sources = run.sources_for(scope_name) if run is not None else []
+                        sources = [claim_sources(claim, tool_sources) for claim in claims]
+                        self.claim_tracker.add_claims(claims, sources, run_id=run_id)
                     except Exception as e:
                         print(f"Warning: Claim tracking failed: {e}")
                 
@@ -161,16 +330,30 @@ class ResearchAgent:
                 
                 print(f"❌ Attempt {attempt + 1} failed: {str(e)}")
                 
+                if isinstance(e, BudgetExhausted):
+                    return self._budget_skipped()
+                
+                if self._is_backend_failure(error_msg):
+                    self.model_breaker.record_failure(e)
+                    if not self.model_breaker.allow_request():
+                        # This model's circuit just opened: the next healthy model
+                        # (admitted once by _select_model) takes the remaining attempts
+                        if not self._select_model():
+                            return self._model_unavailable()
+                        if attempt < max_retries - 1:
+                            continue
+                        return self._fallback_run(input_data["input"], deadline)
+                
                 
                 if any(keyword in error_msg for keyword in ["connection", "timeout", "network"]):
                     if attempt < max_retries - 1:
                         print(f" Connection issue detected. Retrying in {2 ** attempt} seconds...")
                         continue
                     else:
-                        return self._fallback_run(input_data["input"])
+                        return self._fallback_run(input_data["input"], deadline)
                 
                 elif "rate limit" in error_msg or "quota" in error_msg:
-                    if attempt < max_retries - 1:
+                    if attempt < max_retries - 1 and self._can_wait(deadline, 5 * (attempt + 1)):
                         print(f"⏳ Rate limit hit. Waiting {5 * (attempt + 1)} seconds...")
                         time.sleep(5 * (attempt + 1))
                         continue
@@ -182,13 +365,32 @@ class ResearchAgent:
                 
                 else:
                    
-                    return self._fallback_run(input_data["input"])
+                    return self._fallback_run(input_data["input"], deadline)
         
        
-        return self._fallback_run(input_data["input"])
+        return self._fallback_run(input_data["input"], deadline)
     
-    def _fallback_run(self, input_text):
-        """Fallback method using direct LLM call without tools"""
+    def _is_backend_failure(self, error_msg):
+        """Errors that say something about the health of the Groq backend"""
+        return any(keyword in error_msg for keyword in
+                   ["connection", "timeout", "network", "rate limit", "quota", "no healthy upstream"])
+    
+    def _model_unavailable(self):
+        return (f"❌ {self.model_breaker.name} is temporarily unavailable (circuit open, retry in "
+                f"{self.model_breaker.retry_in():.0f}s). Please try again shortly.")
+    
+    def _fallback_run(self, input_text, deadline=None):
+        """Fallback method using direct LLM call without tools.
+        
+        Only called from run(), which has already been admitted by the model's breaker.
+        """
+        budget = current_budget()
+        llm = self.llm
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_LLM_SECONDS or (budget is not None and budget.exhausted()):
+                return self._budget_skipped()
+            llm = self._llm_for(remaining)
         try:
             print(f"🔄 Using fallback mode for {self.agent_type} agent")
             
@@ -233,7 +435,10 @@ Please provide:
 
 Final Report:"""
             
-            response = self.llm.invoke(prompt)
+            response = llm.invoke(prompt)
+            self.model_breaker.record_success()
+            if budget is not None:
+                budget.charge(tokens=usage_tokens(response), requests=1)
             
             
             if hasattr(response, 'content'):
@@ -244,6 +449,8 @@ Final Report:"""
                 return str(response)
                 
         except Exception as e:
+            if self._is_backend_failure(str(e).lower()):
+                self.model_breaker.record_failure(e)
             return f"❌ Fallback failed for {self.agent_type}: {str(e)}"
     
     def close(self):
@@ -0,0 +1,366 @@
+import base64
+import codecs
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+
+# Content-addressed report store. A report is a manifest of sections, each
+# stored once as a zlib-compressed blob named by the SHA-256 of its content,
+# so identical charts and sections across runs share one file on disk.
+# Downloads (markdown, HTML, JSON) are assembled as a stream of chunks read
+# straight from the blobs rather than built as one string in memory.
+
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    "md": "text/markdown",
+    "html": "text/html",
+    "json": "application/json",
+}
+CHART_STYLE = "max-width: 500px; margin: 20px 0;"
+# Report ids and blob names are SHA-256 hex digests; anything else never touches the filesystem
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ArtifactNotFound(KeyError):
+    pass
+
+
+def _markdown_renderer():
+    """Python-Markdown (in requirements.txt); None on installs without it, where HTML export falls back to <pre> blocks"""
+    try:
+        import markdown
+        return markdown.Markdown(extensions=["tables"])
+    except ImportError:
+        return None
+
+
+class ArtifactStore:
+    def __init__(self, root=None):
+        self.root = root or os.getenv("REPORT_STORE_DIR", "report_store")
+        self.lock = threading.Lock()
+        for sub in ("objects", "refs"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".z")
+
+    def _write_atomic(self, path, chunks):
+        """Write to a temp file in the target directory and rename it into place"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, data):
+        """Store bytes (or text) once and return their content digest"""
+        if isinstance(data, str):
+            data = data.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, [zlib.compress(data, 6)])
+        return digest
+
+    def put_stream(self, chunks):
+        """Store a stream of byte chunks without holding it in memory; returns its digest"""
+        objects_dir = os.path.join(self.root, "objects")
+        fd, tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+        hasher = hashlib.sha256()
+        compressor = zlib.compressobj(6)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.flush())
+            digest = hasher.hexdigest()
+            path = self._object_path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def exists(self, digest):
+        return os.path.exists(self._object_path(digest))
+
+    def iter_bytes(self, digest, chunk_size=CHUNK_SIZE):
+        """Decompressed content of a blob, chunk by chunk"""
+        if not DIGEST_PATTERN.fullmatch(digest):
+            raise ArtifactNotFound(digest)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            raise ArtifactNotFound(digest)
+        decompressor = zlib.decompressobj()
+        with open(path, "rb") as f:
+            while True:
+                compressed = f.read(chunk_size)
+                if not compressed:
+                    break
+                chunk = decompressor.decompress(compressed)
+                if chunk:
+                    yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    def read_bytes(self, digest):
+        return b"".join(self.iter_bytes(digest))
+
+    def iter_text(self, digest):
+        """Decoded text chunks; multi-byte characters split across chunks are handled"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for chunk in self.iter_bytes(digest):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def get_ref(self, name):
+        try:
+            with open(os.path.join(self.root, "refs", name)) as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if self.exists(digest) else None
+
+    def set_ref(self, name, digest):
+        self._write_atomic(os.path.join(self.root, "refs", name), [digest.encode()])
+
+    def put_report(self, sections):
+        """Store a report section by section and return its id (the manifest digest).
+
+        `sections` is an iterable of dicts with name, kind ("markdown" or
+        "image") and body. Image sections may carry a cache_key and a render
+        callable instead of a body, so a chart already in the store is not
+        rendered again.
+        """
+        entries = []
+        for section in sections:
+            entry = {"name": section["name"], "kind": section["kind"]}
+            if section["kind"] == "image":
+                entry["media_type"] = section.get("media_type", "image/png")
+                entry["alt"] = section.get("alt", section["name"])
+                digest = self._image_digest(section)
+                if digest is None:
+                    continue
+            else:
+                digest = self.put(section["body"])
+            entry["digest"] = digest
+            entries.append(entry)
+        manifest = {"version": 1, "created_at": time.time(), "sections": entries}
+        # The timestamp stays out of the id so identical reports share one manifest
+        report_id = hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+        manifest_path = os.path.join(self.root, "refs", f"report-{report_id}")
+        if os.path.exists(manifest_path):
+            # Reused reports count as recently used for prune()
+            os.utime(manifest_path)
+        else:
+            self._write_atomic(manifest_path, [json.dumps(manifest).encode()])
+        return report_id
+
+    def _image_digest(self, section):
+        ref_name = None
+        if section.get("cache_key") is not None:
+            key = hashlib.sha256(section["cache_key"].encode()).hexdigest()
+            ref_name = f"{section['name']}-{key}"
+            digest = self.get_ref(ref_name)
+            if digest is not None:
+                return digest
+        body = section["body"] if "body" in section else section["render"]()
+        if not body:
+            return None
+        digest = self.put(body)
+        if ref_name is not None:
+            self.set_ref(ref_name, digest)
+        return digest
+
+    def manifest(self, report_id):
+        if not DIGEST_PATTERN.fullmatch(report_id):
+            raise ArtifactNotFound(report_id)
+        try:
+            with open(os.path.join(self.root, "refs", f"report-{report_id}")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ArtifactNotFound(report_id)
+
+    def iter_export(self, report_id, fmt="md"):
+        """The report in `fmt` as a stream of UTF-8 byte chunks, assembled from the blobs"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        sections = self.manifest(report_id)["sections"]
+        if fmt == "json":
+            chunks = self._iter_json(report_id, sections)
+        elif fmt == "html":
+            chunks = self._iter_html(sections)
+        else:
+            chunks = self._iter_markdown(sections)
+        for chunk in chunks:
+            yield chunk.encode()
+
+    def _iter_base64(self, digest):
+        """Base64 of a blob, encoded in 3-byte-aligned pieces so chunks concatenate cleanly"""
+        pending = b""
+        for chunk in self.iter_bytes(digest):
+            pending += chunk
+            cut = len(pending) - len(pending) % 3
+            if cut:
+                yield base64.b64encode(pending[:cut]).decode()
+                pending = pending[cut:]
+        if pending:
+            yield base64.b64encode(pending).decode()
+
+    def _iter_image_tag(self, entry):
+        yield f"<img src='data:{entry['media_type']};base64,"
+        yield from self._iter_base64(entry["digest"])
+        yield f"' alt='{html.escape(entry['alt'], quote=True)}' style='{CHART_STYLE}'>"
+
+    def _iter_markdown(self, sections):
+        for entry in sections:
+            if entry["kind"] == "image":
+                yield from self._iter_image_tag(entry)
+            else:
+                yield from self.iter_text(entry["digest"])
+
+    def _iter_html(self, sections):
+        renderer = _markdown_renderer()
+        yield ("<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+               "<title>Technical Research Report</title></head><body>\n")
+        for entry in sections:
+            if entry["kind"] == "image":
+                yield from self._iter_image_tag(entry)
+            elif renderer is not None:
+                # Sections are converted one at a time; only the current one is held in memory
+                yield renderer.reset().convert("".join(self.iter_text(entry["digest"])))
+            else:
+                yield "<pre>"
+                for text in self.iter_text(entry["digest"]):
+                    yield html.escape(text)
+                yield "</pre>"
+            yield "\n"
+        yield "</body></html>\n"
+
+    def _iter_json(self, report_id, sections):
+        yield f'{{"report_id": {json.dumps(report_id)}, "sections": ['
+        for i, entry in enumerate(sections):
+            meta = {key: entry[key] for key in ("name", "kind", "media_type", "digest") if key in entry}
+            yield ("" if i == 0 else ", ") + json.dumps(meta)[:-1] + ', "content": "'
+            if entry["kind"] == "image":
+                yield from self._iter_base64(entry["digest"])
+            else:
+                for text in self.iter_text(entry["digest"]):
+                    yield json.dumps(text)[1:-1]
+            yield '"}'
+        yield "]}\n"
+
+    def export(self, report_id, fmt="md"):
+        """Digest of the report rendered in `fmt`, stored as a compressed blob on first request.
+
+        Identical exports share one blob; later requests reuse it through a ref.
+        """
+        ref_name = f"export-{report_id}-{fmt}"
+        digest = self.get_ref(ref_name)
+        if digest is None:
+            digest = self.put_stream(self.iter_export(report_id, fmt))
+            self.set_ref(ref_name, digest)
+        return digest
+
+    def read_export(self, report_id, fmt="md"):
+        """The report rendered in `fmt` as bytes (for download buttons that need the data up front)"""
+        return self.read_bytes(self.export(report_id, fmt))
+
+    def prune(self, max_age_days=None, grace_seconds=3600):
+        """Drop reports and refs unused for `max_age_days`, then blobs nothing references.
+
+        Blobs newer than `grace_seconds` are kept so a report being written
+        concurrently never loses sections before its manifest lands.
+        """
+        if max_age_days is None:
+            max_age_days = float(os.getenv("REPORT_STORE_MAX_AGE_DAYS", 30))
+        now = time.time()
+        cutoff = now - max_age_days * 86400
+        refs_dir = os.path.join(self.root, "refs")
+        removed = {"refs": 0, "objects": 0}
+        live = set()
+        with self.lock:
+            for name in os.listdir(refs_dir):
+                path = os.path.join(refs_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed["refs"] += 1
+                        continue
+                    with open(path) as f:
+                        content = f.read()
+                except (OSError, FileNotFoundError):
+                    continue
+                if name.startswith("report-"):
+                    try:
+                        live.update(entry["digest"] for entry in json.loads(content)["sections"])
+                    except (ValueError, KeyError):
+                        continue
+                else:
+                    live.add(content.strip())
+
+            objects_dir = os.path.join(self.root, "objects")
+            for prefix in os.listdir(objects_dir):
+                prefix_dir = os.path.join(objects_dir, prefix)
+                for name in os.listdir(prefix_dir):
+                    path = os.path.join(prefix_dir, name)
+                    digest = prefix + name[:-len(".z")]
+                    try:
+                        if digest not in live and os.path.getmtime(path) < now - grace_seconds:
+                            os.remove(path)
+                            removed["objects"] += 1
+                    except OSError:
+                        continue
+        return removed
+
+    def start_cleanup_worker(self, interval_seconds=3600):
+        """Prune the store periodically on a daemon thread"""
+        def worker():
+            while True:
+                try:
+                    removed = self.prune()
+                    if removed["refs"] or removed["objects"]:
+                        print(f"🗑️ Report store pruned {removed['refs']} refs, {removed['objects']} blobs")
+                except Exception as e:
+                    print(f"Warning: Report store cleanup failed: {e}")
+                time.sleep(interval_seconds)
+
+        thread = threading.Thread(target=worker, name="report-store-cleanup", daemon=True)
+        thread.start()
+        return thread
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Process-wide store rooted at REPORT_STORE_DIR (pruned via start_cleanup_worker)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
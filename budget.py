@@ -0,0 +1,137 @@
+import math
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from run_context import current_run
+
+# Run-level budget: one wall-clock deadline plus optional token and request
+# caps, shared by every agent, retry loop and tool call of a pipeline run.
+# Each layer sizes its own timeouts from what is left instead of using
+# fixed constants, and degrades (fewer tools, no retries) as it runs out.
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class RunBudget:
+    def __init__(self, deadline_seconds=None, max_tokens=None, max_requests=None):
+        self.started_at = time.monotonic()
+        self.deadline_seconds = deadline_seconds
+        self.deadline = self.started_at + deadline_seconds if deadline_seconds else None
+        self.max_tokens = max_tokens
+        self.max_requests = max_requests
+        self.tokens_used = 0
+        self.requests_used = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, deadline_seconds=None):
+        """Budget from RUN_DEADLINE_SECONDS / RUN_TOKEN_BUDGET / RUN_REQUEST_BUDGET"""
+        tokens = os.getenv("RUN_TOKEN_BUDGET")
+        requests = os.getenv("RUN_REQUEST_BUDGET")
+        return cls(
+            deadline_seconds=deadline_seconds or float(os.getenv("RUN_DEADLINE_SECONDS", 240)),
+            max_tokens=int(tokens) if tokens else None,
+            max_requests=int(requests) if requests else None,
+        )
+
+    def remaining_seconds(self):
+        if self.deadline is None:
+            return math.inf
+        return max(0.0, self.deadline - time.monotonic())
+
+    def remaining_tokens(self):
+        if self.max_tokens is None:
+            return math.inf
+        with self.lock:
+            return max(0, self.max_tokens - self.tokens_used)
+
+    def timeout_for(self, cap, reserve=0.0):
+        """A timeout no larger than `cap` that still leaves `reserve` seconds over"""
+        return max(0.0, min(cap, self.remaining_seconds() - reserve))
+
+    def can_afford(self, seconds=0.0):
+        return self.remaining_seconds() > seconds
+
+    def exhausted(self):
+        with self.lock:
+            if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+                return True
+            if self.max_requests is not None and self.requests_used >= self.max_requests:
+                return True
+        return self.remaining_seconds() <= 0
+
+    def check(self):
+        if self.exhausted():
+            raise BudgetExhausted("Run budget exhausted")
+
+    def charge(self, tokens=0, requests=0):
+        with self.lock:
+            self.tokens_used += tokens
+            self.requests_used += requests
+
+    def summary(self):
+        with self.lock:
+            return {
+                "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+                "deadline_seconds": self.deadline_seconds,
+                "tokens_used": self.tokens_used,
+                "max_tokens": self.max_tokens,
+                "requests_used": self.requests_used,
+                "max_requests": self.max_requests,
+            }
+
+
+def current_budget():
+    """Budget of the active pipeline run, or None outside one"""
+    run = current_run()
+    return getattr(run, "budget", None) if run is not None else None
+
+
+def request_timeout(cap):
+    """Per-request HTTP timeout sized from the run budget"""
+    budget = current_budget()
+    if budget is None:
+        return cap
+    return max(1.0, budget.timeout_for(cap))
+
+
+def usage_tokens(message):
+    """Total tokens reported for an LLM response message, 0 when unknown"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    metadata = getattr(message, "response_metadata", None) or {}
+    return (metadata.get("token_usage") or {}).get("total_tokens", 0)
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Charges every LLM call to the budget and stops the executor once it is spent"""
+
+    raise_error = True
+
+    def __init__(self, budget):
+        self.budget = budget
+
+    def _before_call(self):
+        self.budget.check()
+        self.budget.charge(requests=1)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._before_call()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._before_call()
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens = usage.get("total_tokens", 0)
+        if not tokens:
+            for generations in response.generations:
+                for generation in generations:
+                    tokens += usage_tokens(getattr(generation, "message", None))
+        self.budget.charge(tokens=tokens)
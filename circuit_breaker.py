@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Rolling failure-rate circuit breaker for one backend (tool or model)
+
+    closed    -> calls go through, outcomes are recorded in a time window
+    open      -> calls are rejected immediately until the cooldown expires
+    half_open -> a limited number of probe calls decide whether to close again
+    """
+
+    def __init__(self, name, failure_threshold=0.5, min_calls=3, window_seconds=60,
+                 cooldown_seconds=30, half_open_probes=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.outcomes = deque()
+        self.opened_at = None
+        self.probes_in_flight = 0
+        self.probe_started_at = None
+        self.last_error = None
+
+    def _trim(self, now):
+        while self.outcomes and now - self.outcomes[0][0] > self.window_seconds:
+            self.outcomes.popleft()
+
+    def _failure_rate(self):
+        if not self.outcomes:
+            return 0.0
+        failures = sum(1 for _, ok in self.outcomes if not ok)
+        return failures / len(self.outcomes)
+
+    def allow_request(self):
+        """True if a call may go through now"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.cooldown_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                # A probe that never reported back must not wedge the breaker
+                probe_expired = (self.probe_started_at is not None
+                                 and now - self.probe_started_at > self.cooldown_seconds)
+                if self.probes_in_flight >= self.half_open_probes and not probe_expired:
+                    return False
+                if probe_expired:
+                    self.probes_in_flight = 0
+                self.probes_in_flight += 1
+                self.probe_started_at = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                print(f"🟢 Circuit for {self.name} closed after successful probe")
+                self.state = CLOSED
+                self.outcomes.clear()
+                self.probes_in_flight = 0
+            self.outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self, error=None):
+        with self.lock:
+            now = time.monotonic()
+            self.last_error = str(error) if error else None
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            self.outcomes.append((now, False))
+            self._trim(now)
+            if len(self.outcomes) >= self.min_calls and self._failure_rate() >= self.failure_threshold:
+                self._open(now)
+
+    def _open(self, now):
+        if self.state != OPEN:
+            print(f"🔴 Circuit for {self.name} opened ({self.last_error or 'failures'})")
+        self.state = OPEN
+        self.opened_at = now
+        self.probes_in_flight = 0
+
+    def retry_in(self):
+        """Seconds until an open circuit lets a probe through"""
+        with self.lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at))
+
+    def snapshot(self):
+        with self.lock:
+            self._trim(time.monotonic())
+            return {
+                "state": self.state,
+                "calls": len(self.outcomes),
+                "failure_rate": self._failure_rate(),
+                "last_error": self.last_error,
+            }
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Process-wide breaker for a backend, configured through CIRCUIT_* env vars"""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=float(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 0.5)),
+                min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", 3)),
+                window_seconds=float(os.getenv("CIRCUIT_WINDOW_SECONDS", 60)),
+                cooldown_seconds=float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", 30)),
+                half_open_probes=int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", 1)),
+            )
+        return _breakers[name]
+
+
+def get_breaker_states():
+    """State snapshot of every registered breaker, keyed by name"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# Worst state wins when several processes report the same backend
+_STATE_SEVERITY = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def merge_breaker_states(reports):
+    """Combine get_breaker_states() reports from several processes into one view"""
+    merged = {}
+    for report in reports:
+        for name, info in report.items():
+            total = merged.get(name)
+            if total is None:
+                merged[name] = dict(info)
+                continue
+            calls = total["calls"] + info["calls"]
+            if calls:
+                total["failure_rate"] = (total["failure_rate"] * total["calls"]
+                                         + info["failure_rate"] * info["calls"]) / calls
+            total["calls"] = calls
+            if _STATE_SEVERITY.get(info["state"], 0) > _STATE_SEVERITY.get(total["state"], 0):
+                total["state"] = info["state"]
+                total["last_error"] = info["last_error"] or total["last_error"]
+    return merged
@@ -0,0 +1,351 @@
+import argparse
+import bisect
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter, defaultdict
+
+# Local offline corpus: a compact on-disk BM25 index over Wikipedia/arXiv
+# dumps (or any JSONL of documents). Postings and documents are read through
+# mmap, so queries only touch the pages they need.
+#
+# Index layout (one directory):
+#   meta.json          document count, average length, source names, format version
+#   terms.bin          UTF-8 terms concatenated in sorted order
+#   term_offsets.bin   uint64 byte offsets into terms.bin (n_terms + 1 entries)
+#   term_postings.bin  uint64 byte offset into postings.bin per term
+#   term_dfs.bin       uint32 document frequency per term
+#   postings.bin       per term: df uint32 doc ids followed by df uint16 term freqs
+#   doc_lengths.bin    uint32 token count per document
+#   doc_sources.bin    uint8 index into meta.json "sources" per document
+#   doc_offsets.bin    uint64 byte offsets into docs.bin (n_docs + 1 entries)
+#   docs.bin           zlib-compressed JSON document records
+#
+# The lexicon is looked up by binary search over the mapped term arrays, so
+# opening an index costs the same for ten thousand terms as for ten million.
+
+INDEX_VERSION = 2
+# Sources per index (doc_sources.bin stores one byte per document)
+MAX_SOURCES = 256
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "to", "was", "were", "will", "with",
+    "this", "these", "those", "what", "which", "how", "vs", "versus", "compare",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords (keeps terms like c++, next.js)"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def normalize_document(record, default_source="custom"):
+    """Map Wikipedia extractor, arXiv metadata and generic JSONL records to one shape"""
+    text = record.get("text") or record.get("abstract") or record.get("summary") or record.get("content") or ""
+    source = record.get("source") or default_source
+    url = record.get("url")
+    if not url and source == "arxiv" and record.get("id"):
+        url = f"https://arxiv.org/abs/{record['id']}"
+    authors = record.get("authors", "")
+    if isinstance(authors, list):
+        authors = ", ".join(authors)
+    return {
+        "title": " ".join(str(record.get("title", "")).split()),
+        "text": " ".join(str(text).split()),
+        "source": source,
+        "url": url,
+        "authors": authors,
+        "published": record.get("published") or record.get("update_date") or "",
+    }
+
+
+def build_index(input_paths, out_dir, default_source="custom", min_text_chars=40):
+    """Ingest JSONL files into an index directory; returns the document count"""
+    os.makedirs(out_dir, exist_ok=True)
+    postings = defaultdict(lambda: (array("I"), array("H")))
+    doc_lengths = array("I")
+    doc_sources = array("B")
+    doc_offsets = array("Q", [0])
+    sources = {}
+
+    with open(os.path.join(out_dir, "docs.bin"), "wb") as docs_file:
+        for path in input_paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        doc = normalize_document(json.loads(line), default_source)
+                    except json.JSONDecodeError:
+                        continue
+                    if len(doc["text"]) < min_text_chars:
+                        continue
+                    if doc["source"] not in sources:
+                        if len(sources) >= MAX_SOURCES:
+                            raise ValueError(f"More than {MAX_SOURCES} distinct sources in the input")
+                        sources[doc["source"]] = len(sources)
+
+                    doc_id = len(doc_lengths)
+                    terms = tokenize(f"{doc['title']} {doc['text']}")
+                    for term, tf in Counter(terms).items():
+                        ids, tfs = postings[term]
+                        ids.append(doc_id)
+                        tfs.append(min(tf, 65535))
+                    doc_lengths.append(len(terms))
+                    doc_sources.append(sources[doc["source"]])
+
+                    blob = zlib.compress(json.dumps(doc).encode())
+                    docs_file.write(blob)
+                    doc_offsets.append(doc_offsets[-1] + len(blob))
+
+    # Python string order is code point order, which UTF-8 byte order preserves,
+    # so the byte comparisons in LocalCorpus._find_term agree with this sort
+    term_offsets = array("Q", [0])
+    term_postings = array("Q")
+    term_dfs = array("I")
+    with open(os.path.join(out_dir, "postings.bin"), "wb") as postings_file, \
+            open(os.path.join(out_dir, "terms.bin"), "wb") as terms_file:
+        offset = 0
+        for term in sorted(postings):
+            ids, tfs = postings[term]
+            encoded = term.encode()
+            terms_file.write(encoded)
+            term_offsets.append(term_offsets[-1] + len(encoded))
+            term_postings.append(offset)
+            term_dfs.append(len(ids))
+            ids.tofile(postings_file)
+            tfs.tofile(postings_file)
+            offset += len(ids) * (ids.itemsize + tfs.itemsize)
+
+    for name, values in (
+        ("term_offsets.bin", term_offsets),
+        ("term_postings.bin", term_postings),
+        ("term_dfs.bin", term_dfs),
+        ("doc_lengths.bin", doc_lengths),
+        ("doc_sources.bin", doc_sources),
+        ("doc_offsets.bin", doc_offsets),
+    ):
+        with open(os.path.join(out_dir, name), "wb") as f:
+            values.tofile(f)
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "n_docs": len(doc_lengths),
+            "n_terms": len(term_dfs),
+            "avg_doc_length": (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0,
+            "sources": list(sources),
+        }, f)
+    return len(doc_lengths)
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LocalCorpus:
+    """Read-only BM25 search over an index directory built by build_index"""
+
+    def __init__(self, index_dir, k1=1.2, b=0.75, max_candidates=None):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        # Upper bound on documents scored per query; past it, terms only rescore
+        # the candidates already found
+        self.max_candidates = max_candidates or int(os.getenv("LOCAL_CORPUS_MAX_CANDIDATES", 50000))
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Index format {self.meta.get('version')} is outdated; rebuild it with `corpus.py build`")
+        self.terms = _map_file(os.path.join(index_dir, "terms.bin"))
+        self.term_offsets = self._map_array("term_offsets.bin", "Q")
+        self.term_postings = self._map_array("term_postings.bin", "Q")
+        self.term_dfs = self._map_array("term_dfs.bin", "I")
+        self.postings = _map_file(os.path.join(index_dir, "postings.bin"))
+        self.docs = _map_file(os.path.join(index_dir, "docs.bin"))
+        self.doc_lengths = self._map_array("doc_lengths.bin", "I")
+        self.doc_sources = self._map_array("doc_sources.bin", "B")
+        self.doc_offsets = self._map_array("doc_offsets.bin", "Q")
+        self.n_docs = self.meta["n_docs"]
+        self.n_terms = self.meta["n_terms"]
+        self.sources = {name: code for code, name in enumerate(self.meta["sources"])}
+        self.avg_doc_length = self.meta["avg_doc_length"] or 1.0
+
+    def _map_array(self, name, typecode):
+        return memoryview(_map_file(os.path.join(self.index_dir, name))).cast(typecode)
+
+    def _find_term(self, term):
+        """Position of `term` in the sorted lexicon, or None"""
+        key = term.encode()
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.terms[self.term_offsets[mid]:self.term_offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self.terms[self.term_offsets[lo]:self.term_offsets[lo + 1]] == key:
+            return lo
+        return None
+
+    def _term_postings(self, position):
+        offset, df = self.term_postings[position], self.term_dfs[position]
+        view = memoryview(self.postings)
+        ids = view[offset:offset + 4 * df].cast("I")
+        tfs = view[offset + 4 * df:offset + 6 * df].cast("H")
+        return ids, tfs
+
+    def _walk_postings(self, ids, tfs, scores, source_code=None):
+        """(doc_id, tf) pairs of a posting list from `source_code`, up to max_candidates documents"""
+        doc_sources = self.doc_sources
+        candidates = len(scores)
+        for doc_id, tf in zip(ids, tfs):
+            if source_code is not None and doc_sources[doc_id] != source_code:
+                continue
+            if doc_id not in scores:
+                if candidates >= self.max_candidates:
+                    break
+                candidates += 1
+            yield doc_id, tf
+
+    def get_document(self, doc_id):
+        start, end = self.doc_offsets[doc_id], self.doc_offsets[doc_id + 1]
+        return json.loads(zlib.decompress(self.docs[start:end]))
+
+    def search(self, query, top_k=2, source=None):
+        """Top documents as dicts with score and query-term coverage"""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        positions = [position for position in map(self._find_term, query_terms) if position is not None]
+        if not positions or not self.n_docs:
+            return []
+        source_code = None
+        if source is not None:
+            # Filter on the per-document source column, before anything is decompressed
+            source_code = self.sources.get(source)
+            if source_code is None:
+                return []
+
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        # Rare terms first; very common terms, and every term once max_candidates
+        # documents are in play, only rescore existing candidates (binary search
+        # in their postings) instead of walking millions of entries
+        common_df = max(10000, self.n_docs // 10)
+        for position in sorted(positions, key=lambda p: self.term_dfs[p]):
+            ids, tfs = self._term_postings(position)
+            df = len(ids)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            if scores and (df > common_df or len(scores) >= self.max_candidates):
+                pairs = []
+                for doc_id in list(scores):
+                    i = bisect.bisect_left(ids, doc_id)
+                    if i < df and ids[i] == doc_id:
+                        pairs.append((doc_id, tfs[i]))
+            else:
+                pairs = self._walk_postings(ids, tfs, scores, source_code)
+            for doc_id, tf in pairs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[doc_id] += 1
+
+        results = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            doc = self.get_document(doc_id)
+            results.append({**doc, "score": score, "coverage": matched[doc_id] / len(query_terms)})
+            if len(results) >= top_k:
+                break
+        return results
+
+
+def format_results(results, source, doc_content_chars_max=4000):
+    """Render hits in the same layout as the network tool observations"""
+    if source == "arxiv":
+        docs = [
+            f"Published: {doc['published']}\nTitle: {doc['title']}\nAuthors: {doc['authors']}\nSummary: {doc['text']}"
+            for doc in results
+        ]
+    else:
+        docs = [f"Page: {doc['title']}\nSummary: {doc['text']}" for doc in results]
+    return "\n\n".join(docs)[:doc_content_chars_max]
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_local_corpus():
+    """Process-wide corpus from LOCAL_CORPUS_DIR, or None when not configured"""
+    global _corpus
+    index_dir = os.getenv("LOCAL_CORPUS_DIR")
+    if not index_dir or not os.path.exists(os.path.join(index_dir, "meta.json")):
+        return None
+    with _corpus_lock:
+        if _corpus is None or _corpus.index_dir != index_dir:
+            try:
+                _corpus = LocalCorpus(index_dir)
+                print(f"✅ Local corpus loaded ({_corpus.n_docs} documents)")
+            except Exception as e:
+                print(f"⚠️ Local corpus failed to load: {e}")
+                return None
+        return _corpus
+
+
+def local_first(search_func, source, top_k_results=2, doc_content_chars_max=4000):
+    """Answer from the local corpus when recall is good, otherwise fall back to the network"""
+    min_score = float(os.getenv("LOCAL_CORPUS_MIN_SCORE", 5.0))
+    min_coverage = float(os.getenv("LOCAL_CORPUS_MIN_COVERAGE", 0.6))
+
+    def search(query):
+        corpus = get_local_corpus()
+        if corpus is not None:
+            try:
+                # Indexes built from generic JSONL tag documents "custom" (or another
+                # --source); when none carry this tool's source, search them all
+                source_filter = source if source in corpus.sources else None
+                results = corpus.search(query, top_k=top_k_results, source=source_filter)
+                if results and results[0]["score"] >= min_score and results[0]["coverage"] >= min_coverage:
+                    return format_results(results, source, doc_content_chars_max)
+            except Exception as e:
+                print(f"⚠️ Local corpus search failed: {e}")
+        return search_func(query)
+
+    return search
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local offline corpus index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Ingest JSONL documents into an index")
+    build_parser.add_argument("inputs", nargs="+", help="JSONL files (Wikipedia extractor, arXiv metadata, or generic)")
+    build_parser.add_argument("--out", default=os.getenv("LOCAL_CORPUS_DIR", "corpus_index"))
+    build_parser.add_argument("--source", default="custom", help="Source tag for records without one (wikipedia, arxiv, ...); the tools search untagged indexes as a whole")
+
+    search_parser = subparsers.add_parser("search", help="Query an index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index", default=os.getenv("LOCAL_CORPUS_DIR", "corpus_index"))
+    search_parser.add_argument("--top-k", type=int, default=5)
+    search_parser.add_argument("--source", default=None)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        count = build_index(args.inputs, args.out, args.source)
+        print(f"✅ Indexed {count} documents into {args.out}")
+    else:
+        for doc in LocalCorpus(args.index).search(args.query, args.top_k, args.source):
+            print(f"{doc['score']:.2f}  [{doc['source']}] {doc['title']} ({doc['coverage']:.0%} of terms)")
+
+
+if __name__ == "__main__":
+    main()
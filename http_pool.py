@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+
+# Process-wide keep-alive HTTP clients, one per host. Every tool backend and
+# every ChatGroq client goes through here so repeated calls reuse warm
+# TLS connections instead of paying the handshake each time.
+
+_clients = {}
+_stats = {}
+_lock = threading.Lock()
+_owner_pid = os.getpid()
+# Optional host -> httpx transport factory, used to point clients at local stand-ins
+_transport_factory = None
+# Wikimedia (and other public APIs) throttle or block generic client User-Agents;
+# deployments should set HTTP_USER_AGENT with a contact URL or address
+DEFAULT_USER_AGENT = "tech-research-agents/1.0 (multi-agent research pipeline; python-httpx)"
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_pool_config():
+    """Pool settings, configurable through environment variables"""
+    return {
+        "max_connections": _env_int("HTTP_POOL_MAX_CONNECTIONS", 20),
+        "max_keepalive_connections": _env_int("HTTP_POOL_MAX_KEEPALIVE", 10),
+        "keepalive_expiry": _env_float("HTTP_POOL_KEEPALIVE_EXPIRY", 30.0),
+        "http2": os.getenv("HTTP_POOL_HTTP2", "1").lower() not in ("0", "false", "no"),
+        "timeout": _env_float("HTTP_POOL_TIMEOUT", 30.0),
+        "user_agent": os.getenv("HTTP_USER_AGENT") or DEFAULT_USER_AGENT,
+    }
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _reset_after_fork():
+    """Connections must never be shared with a forked worker process"""
+    global _owner_pid
+    if os.getpid() != _owner_pid:
+        _clients.clear()
+        _stats.clear()
+        _owner_pid = os.getpid()
+
+
+def _make_hooks(host):
+    stats = _stats[host]
+
+    def on_request(request):
+        request.extensions["pool_started"] = time.perf_counter()
+        with _lock:
+            stats["requests"] += 1
+
+    def on_response(response):
+        started = response.request.extensions.get("pool_started")
+        with _lock:
+            stats["responses"] += 1
+            stats["http_versions"][response.http_version] = stats["http_versions"].get(response.http_version, 0) + 1
+            if started is not None:
+                stats["total_seconds"] += time.perf_counter() - started
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def get_http_client(host):
+    """Shared keep-alive httpx client for a host (created on first use)"""
+    import httpx
+
+    with _lock:
+        _reset_after_fork()
+        client = _clients.get(host)
+        if client is not None and not client.is_closed:
+            return client
+
+        config = get_pool_config()
+        use_http2 = config["http2"] and _http2_available()
+        _stats[host] = {
+            "requests": 0,
+            "responses": 0,
+            "total_seconds": 0.0,
+            "http_versions": {},
+            "http2": use_http2,
+            "created_at": time.time(),
+        }
+        client = httpx.Client(
+            http2=use_http2,
+            timeout=config["timeout"],
+            headers={"User-Agent": config["user_agent"]},
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive_connections"],
+                keepalive_expiry=config["keepalive_expiry"],
+            ),
+            event_hooks=_make_hooks(host),
+            transport=_transport_factory(host) if _transport_factory is not None else None,
+        )
+        _clients[host] = client
+        return client
+
+
+def set_transport_factory(factory):
+    """Route new clients through `factory(host)` instead of the network (None restores it).
+
+    Existing clients are closed so every host picks up the change.
+    """
+    global _transport_factory
+    close_all()
+    with _lock:
+        _transport_factory = factory
+
+
+def _open_connections(client):
+    """Best-effort count of pooled connections (relies on httpcore internals)"""
+    try:
+        pool = client._transport._pool
+        return len(pool.connections)
+    except Exception:
+        return None
+
+
+def get_pool_stats():
+    """Per-host request counts, latency and pool occupancy"""
+    with _lock:
+        _reset_after_fork()
+        report = {}
+        for host, stats in _stats.items():
+            responses = stats["responses"]
+            report[host] = {
+                "requests": stats["requests"],
+                "responses": responses,
+                "avg_latency_ms": (stats["total_seconds"] / responses * 1000) if responses else 0.0,
+                "http_versions": dict(stats["http_versions"]),
+                "http2": stats["http2"],
+                "open_connections": _open_connections(_clients[host]) if host in _clients else None,
+            }
+        return report
+
+
+def merge_pool_stats(reports):
+    """Combine get_pool_stats() reports from several processes into one per-host view"""
+    merged = {}
+    for report in reports:
+        for host, stats in report.items():
+            total = merged.setdefault(host, {
+                "requests": 0,
+                "responses": 0,
+                "avg_latency_ms": 0.0,
+                "http_versions": {},
+                "http2": False,
+                "open_connections": 0,
+            })
+            responses = total["responses"] + stats["responses"]
+            if responses:
+                total["avg_latency_ms"] = (total["avg_latency_ms"] * total["responses"]
+                                           + stats["avg_latency_ms"] * stats["responses"]) / responses
+            total["requests"] += stats["requests"]
+            total["responses"] = responses
+            for version, count in stats["http_versions"].items():
+                total["http_versions"][version] = total["http_versions"].get(version, 0) + count
+            total["http2"] = total["http2"] or stats["http2"]
+            total["open_connections"] += stats["open_connections"] or 0
+    return merged
+
+
+def close_all():
+    """Close every pooled client"""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                print(f"Warning: Error closing HTTP client: {e}")
+        _clients.clear()
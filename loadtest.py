@@ -0,0 +1,390 @@
+import argparse
+import gc
+import hashlib
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import http_pool
+from artifact_store import ArtifactStore
+from agent_system import GROQ_HOST
+from tools import TAVILY_HOST, WIKIPEDIA_HOST, ARXIV_HOST
+
+# Concurrent-session load test. N simulated Streamlit sessions share one set
+# of agents (as @st.cache_resource does in main.py) and submit queries
+# through the real pipeline, ClaimTracker and tool chain. Only the network
+# is replaced: Groq and the search backends are local stand-ins behind the
+# pooled HTTP clients that answer after an injected, seeded latency, so a
+# saturation point measured on one commit can be reproduced on the next.
+
+DEFAULT_QUERIES = [
+    "Compare Next.js and SvelteKit for server-side rendering performance",
+    "What are the trade-offs between PostgreSQL and MongoDB for analytics workloads?",
+    "How does Rust's borrow checker compare to garbage collection in Go?",
+    "Evaluate vector databases for retrieval-augmented generation in 2024",
+    "Kubernetes versus Nomad for small platform teams",
+    "WebAssembly adoption for server-side workloads",
+]
+RESULTS_FILE = "loadtest_results.jsonl"
+
+
+def _latency(seed, key, mean_ms, jitter):
+    """Reproducible latency for one request: the same request body always waits the same time"""
+    rng = random.Random(f"{seed}:{hashlib.sha1(key).hexdigest()}")
+    return max(0.0, rng.gauss(mean_ms, mean_ms * jitter)) / 1000
+
+
+class StandInBackends:
+    """httpx transports that answer Groq, Tavily, Wikipedia and arXiv requests locally"""
+
+    def __init__(self, llm_latency_ms=800, search_latency_ms=300, jitter=0.25, seed=0):
+        self.llm_latency_ms = llm_latency_ms
+        self.search_latency_ms = search_latency_ms
+        self.jitter = jitter
+        self.seed = seed
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def transport_for(self, host):
+        import httpx
+
+        handlers = {
+            GROQ_HOST: self._groq,
+            TAVILY_HOST: self._tavily,
+            WIKIPEDIA_HOST: self._wikipedia,
+            ARXIV_HOST: self._arxiv,
+        }
+        handler = handlers.get(host)
+        if handler is None:
+            raise ValueError(f"No stand-in backend for {host}")
+
+        def handle(request):
+            with self.lock:
+                self.calls[host] = self.calls.get(host, 0) + 1
+            mean_ms = self.llm_latency_ms if host == GROQ_HOST else self.search_latency_ms
+            time.sleep(_latency(self.seed, request.url.raw_path + request.content, mean_ms, self.jitter))
+            return handler(request)
+
+        return httpx.MockTransport(handle)
+
+    def _groq(self, request):
+        import httpx
+
+        payload = json.loads(request.content or b"{}")
+        messages = payload.get("messages", [])
+        question = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+        already_searched = any(m.get("role") == "tool" for m in messages)
+        search_tool = None
+        for tool in payload.get("tools") or []:
+            properties = tool.get("function", {}).get("parameters", {}).get("properties", {})
+            if len(properties) == 1 and next(iter(properties.values())).get("type") == "string":
+                search_tool = (tool["function"]["name"], next(iter(properties)))
+                break
+
+        message = {"role": "assistant", "content": None}
+        if search_tool and not already_searched:
+            name, argument = search_tool
+            message["tool_calls"] = [{
+                "id": f"call_{hashlib.sha1(question.encode()).hexdigest()[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps({argument: question[:200]})},
+            }]
+            finish_reason = "tool_calls"
+        else:
+            topic = " ".join(question.split()[:8]) or "the topic"
+            message["content"] = "\n".join(
+                f"- Finding {i} about {topic}: measured improvement of {10 * i}% in 2024 benchmarks"
+                for i in range(1, 6)
+            )
+            finish_reason = "stop"
+
+        prompt_tokens = len(request.content) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{hashlib.sha1(request.content).hexdigest()[:16]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stand-in"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _tavily(self, request):
+        import httpx
+
+        query = json.loads(request.content or b"{}").get("query", "")
+        return httpx.Response(200, json={"results": [
+            {"url": f"https://example.com/{i}", "content": f"Result {i} for {query}. " * 20}
+            for i in range(3)
+        ]})
+
+    def _wikipedia(self, request):
+        import httpx
+
+        query = request.url.params.get("gsrsearch", "")
+        return httpx.Response(200, json={"query": {"pages": {
+            str(i): {"title": f"{query} ({i})", "index": i, "extract": f"Encyclopedic summary of {query}. " * 30}
+            for i in range(1, 3)
+        }}})
+
+    def _arxiv(self, request):
+        import httpx
+
+        query = request.url.params.get("search_query", "")
+        entries = "".join(
+            f"<entry><title>Study {i} of {query}</title><summary>{'Abstract text. ' * 40}</summary>"
+            f"<published>2024-0{i}-01T00:00:00Z</published><author><name>Author {i}</name></author></entry>"
+            for i in range(1, 3)
+        )
+        return httpx.Response(200, text=f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _rss_bytes():
+    """Current resident set size (Linux), None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _lock_totals(agents):
+    totals = {"acquisitions": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+    for agent in agents.values():
+        stats = agent.claim_tracker.lock_stats()
+        totals["acquisitions"] += stats["acquisitions"]
+        totals["wait_seconds"] += stats["wait_seconds"]
+        totals["max_wait_seconds"] = max(totals["max_wait_seconds"], stats["max_wait_seconds"])
+    return totals
+
+
+def run_session(agents, queries, session_index, queries_per_session, report_store):
+    """One simulated user: submits queries one after another, as main.py does per click"""
+    from pipeline import run_pipeline
+    from visualization import store_report
+
+    timings = []
+    for i in range(queries_per_session):
+        query = queries[(session_index + i) % len(queries)]
+        started = time.perf_counter()
+        try:
+            result = run_pipeline(agents, query)
+            if report_store is not None:
+                store_report(result["research"], result["critique"], result["synthesis"],
+                             result["verification_data"], result.get("structured_claims"), store=report_store)
+            failed = any(str(result[phase]).startswith(("❌", "⏱️"))
+                         for phase in ("research", "critique", "synthesis"))
+        except Exception as e:
+            print(f"❌ Session {session_index} query failed: {e}")
+            failed = True
+        timings.append((time.perf_counter() - started, failed))
+    return timings
+
+
+def run_level(agents, concurrency, queries, queries_per_session, report_store, trace_memory):
+    """Run `concurrency` sessions at once and measure throughput, latency, lock wait and memory"""
+    gc.collect()
+    lock_before = _lock_totals(agents)
+    rss_before = _rss_bytes()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_session, agents, queries, index, queries_per_session, report_store)
+            for index in range(concurrency)
+        ]
+        timings = [timing for future in futures for timing in future.result()]
+
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    traced_growth = None
+    if trace_memory:
+        traced_growth = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    rss_after = _rss_bytes()
+    lock_after = _lock_totals(agents)
+
+    latencies = [seconds for seconds, _ in timings]
+    lock_acquisitions = lock_after["acquisitions"] - lock_before["acquisitions"]
+    lock_wait = lock_after["wait_seconds"] - lock_before["wait_seconds"]
+    return {
+        "concurrency": concurrency,
+        "queries": len(timings),
+        "errors": sum(1 for _, failed in timings if failed),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_qpm": round(len(timings) / elapsed * 60, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p95": round(percentile(latencies, 95), 3),
+        "latency_p99": round(percentile(latencies, 99), 3),
+        "lock_acquisitions": lock_acquisitions,
+        "lock_wait_seconds": round(lock_wait, 4),
+        "lock_wait_avg_ms": round(lock_wait / lock_acquisitions * 1000, 3) if lock_acquisitions else 0.0,
+        "lock_wait_max_ms": round(lock_after["max_wait_seconds"] * 1000, 3),
+        "memory_per_session_kb": round(traced_growth / concurrency / 1024, 1) if traced_growth is not None else None,
+        "rss_growth_per_session_kb": (round((rss_after - rss_before) / concurrency / 1024, 1)
+                                      if rss_before is not None and rss_after is not None else None),
+    }
+
+
+def find_saturation(levels, min_gain=0.1, max_p95=None):
+    """First concurrency level where throughput stops growing by `min_gain` or p95 breaks the SLO"""
+    for previous, level in zip(levels, levels[1:]):
+        if level["throughput_qpm"] < previous["throughput_qpm"] * (1 + min_gain):
+            return level["concurrency"]
+        if max_p95 is not None and level["latency_p95"] > max_p95:
+            return level["concurrency"]
+    return None
+
+
+def current_version():
+    """Git description of the tree under test, so results can be compared across commits"""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_load_test(levels, queries_per_session=2, queries=None, llm_latency_ms=800, search_latency_ms=300,
+                  jitter=0.25, seed=0, render_report=True, trace_memory=True, max_p95=None):
+    """Ramp through the concurrency `levels` against stand-in backends and return the report"""
+    from pipeline import create_agents, close_agents
+
+    queries = queries or DEFAULT_QUERIES
+    backends = StandInBackends(llm_latency_ms, search_latency_ms, jitter, seed)
+    os.environ.setdefault("TAVILY_API_KEY", "load-test")
+    http_pool.set_transport_factory(backends.transport_for)
+    db_dir = tempfile.mkdtemp(prefix="loadtest-")
+    previous_db = os.environ.get("CLAIM_DB_PATH")
+    os.environ["CLAIM_DB_PATH"] = os.path.join(db_dir, "research.db")
+    report_store = ArtifactStore(os.path.join(db_dir, "reports")) if render_report else None
+    try:
+        # One shared set of agents, as @st.cache_resource gives every Streamlit session
+        agents = create_agents("load-test")
+        try:
+            results = []
+            for concurrency in levels:
+                print(f"🔁 {concurrency} concurrent sessions x {queries_per_session} queries")
+                level = run_level(agents, concurrency, queries, queries_per_session, report_store, trace_memory)
+                print(f"   {level['throughput_qpm']} queries/min, p95 {level['latency_p95']}s, "
+                      f"lock wait {level['lock_wait_avg_ms']}ms avg")
+                results.append(level)
+        finally:
+            close_agents(agents)
+    finally:
+        http_pool.set_transport_factory(None)
+        if previous_db is None:
+            os.environ.pop("CLAIM_DB_PATH", None)
+        else:
+            os.environ["CLAIM_DB_PATH"] = previous_db
+
+    return {
+        "version": current_version(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "config": {
+            "levels": list(levels),
+            "queries_per_session": queries_per_session,
+            "llm_latency_ms": llm_latency_ms,
+            "search_latency_ms": search_latency_ms,
+            "jitter": jitter,
+            "seed": seed,
+            "render_report": render_report,
+        },
+        "backend_calls": dict(backends.calls),
+        "levels": results,
+        "saturation_concurrency": find_saturation(results, max_p95=max_p95),
+    }
+
+
+def load_history(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_report(report):
+    print(f"\n📊 Load test for {report['version']}")
+    print(f"{'sessions':>8} {'q/min':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+          f"{'lock ms':>8} {'KB/sess':>8} {'errors':>6}")
+    for level in report["levels"]:
+        memory = level["memory_per_session_kb"]
+        print(f"{level['concurrency']:>8} {level['throughput_qpm']:>8} {level['latency_p50']:>8} "
+              f"{level['latency_p95']:>8} {level['latency_p99']:>8} {level['lock_wait_avg_ms']:>8} "
+              f"{memory if memory is not None else '-':>8} {level['errors']:>6}")
+    saturation = report["saturation_concurrency"]
+    print(f"Saturation at {saturation} concurrent sessions" if saturation
+          else "No saturation within the tested levels")
+
+
+def print_history(history):
+    """One line per recorded run, oldest first, for comparing versions"""
+    print(f"{'version':<20} {'timestamp':<20} {'saturation':>10} {'peak q/min':>10} {'p95 @ peak':>10}")
+    for report in history:
+        peak = max(report["levels"], key=lambda level: level["throughput_qpm"], default=None)
+        print(f"{report['version']:<20} {report['timestamp']:<20} "
+              f"{str(report['saturation_concurrency'] or '-'):>10} "
+              f"{peak['throughput_qpm'] if peak else '-':>10} {peak['latency_p95'] if peak else '-':>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against stand-in Groq and search backends")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrent session counts to ramp through")
+    parser.add_argument("--queries-per-session", type=int, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--search-latency-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency standard deviation as a fraction of the mean")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95", type=float, default=None, help="p95 latency SLO in seconds that also marks saturation")
+    parser.add_argument("--no-report", action="store_true", help="Skip storing the report and chart per query")
+    parser.add_argument("--no-trace-memory", action="store_true", help="Skip tracemalloc (lower overhead, RSS only)")
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSONL file the run is appended to")
+    parser.add_argument("--history", action="store_true", help="Print recorded runs and exit")
+    args = parser.parse_args()
+
+    if args.history:
+        print_history(load_history(args.results))
+        return
+
+    report = run_load_test(
+        [int(level) for level in args.levels.split(",")],
+        queries_per_session=args.queries_per_session,
+        llm_latency_ms=args.llm_latency_ms,
+        search_latency_ms=args.search_latency_ms,
+        jitter=args.jitter,
+        seed=args.seed,
+        render_report=not args.no_report,
+        trace_memory=not args.no_trace_memory,
+        max_p95=args.max_p95,
+    )
+    print_report(report)
+    with open(args.results, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"✅ Appended results to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
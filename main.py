@@ -1,8 +1,14 @@
 import streamlit as st
-from agent_system import ResearchAgent
-from visualization import format_report
-import time
+from pipeline import create_agents, run_pipeline
+from budget import RunBudget
+from service import RemoteReportStore, get_service_health, run_remote_pipeline
+from visualization import store_report
+from artifact_store import FORMATS, get_artifact_store
+from circuit_breaker import get_breaker_states
+from http_pool import get_pool_stats
+from verification import start_claim_retention
 import os
+import uuid
 from dotenv import load_dotenv
 import json
 
@@ -126,17 +132,49 @@ with st.sidebar:
         
         include_sources = st.checkbox("Include Source Citations", value=True)
         real_time_update = st.checkbox("Real-time Updates", value=True)
+        
+        time_budget = st.slider(
+            "Time Budget (seconds)",
+            min_value=30,
+            max_value=600,
+            value=int(float(os.getenv("RUN_DEADLINE_SECONDS", 240))),
+            step=30,
+            help="The whole pipeline returns within this time; later phases use fewer tools as it runs out"
+        )
+        
+        incremental_mode = st.checkbox(
+            "Incremental Mode",
+            value=False,
+            help="Reuse fresh claims from earlier runs and only research gaps and stale claims"
+        )
+        
+        structured_claims = st.checkbox(
+            "Structured Claims",
+            value=False,
+            help="Researcher records typed claims; comparison tables are built locally instead of by the LLM"
+        )
+        
+        report_format = st.selectbox(
+            "Report Download Format",
+            list(FORMATS),
+            format_func={"md": "Markdown", "html": "HTML", "json": "JSON"}.get,
+            help="Only the chosen format is rendered for download"
+        )
+        
+        sharded_critic = st.checkbox(
+            "Sharded Critic",
+            value=False,
+            help="Critique claim batches concurrently instead of the whole research in one pass"
+        )
+        shard_size = 8
+        critic_concurrency = 4
+        if sharded_critic:
+            shard_size = st.slider("Claims per Shard", min_value=2, max_value=20, value=8)
+            critic_concurrency = st.slider("Concurrent Shards", min_value=1, max_value=8, value=4)
     
    
     st.markdown("### 📊 System Status")
-    st.markdown("""
-    <div class="sidebar-info">
-        <strong>🟢 APIs Connected</strong><br>
-        • GROQ API: Active<br>
-        • Tavily API: Active<br>
-        • Agents: Ready
-    </div>
-    """, unsafe_allow_html=True)
+    system_status_placeholder = st.empty()
     
     
     st.markdown("### 📚 Quick Templates")
@@ -150,25 +188,111 @@ with st.sidebar:
     selected_template = st.selectbox("Choose a template:", ["Custom"] + list(template_queries.keys()))
 
 
+# When set, the app is a thin client of service.py instead of running agents in-process
+service_url = os.getenv("PIPELINE_SERVICE_URL", "").rstrip("/")
+
+# Each browser session is its own client for the service's per-client fair queueing
+if "client_id" not in st.session_state:
+    st.session_state.client_id = f"streamlit-{uuid.uuid4().hex}"
+
+
 @st.cache_resource(show_spinner="🚀 Initializing AI agents...")
 def get_agents():
     groq_key = os.getenv("GROQ_API_KEY")
     
     try:
-        test_agent = ResearchAgent("researcher", groq_key)
-        return {
-            "researcher": test_agent,
-            "critic": ResearchAgent("critic", groq_key),
-            "synthesizer": ResearchAgent("synthesizer", groq_key)
-        }
+        return create_agents(groq_key)
     except Exception as e:
         st.error(f"❌ Failed to initialize agents: {str(e)}")
         st.error("Please check your API keys and internet connection.")
         st.stop()
 
 
-with st.spinner("Loading AI agents..."):
-    agents = get_agents()
+@st.cache_resource
+def get_claim_retention():
+    """One retention worker for the whole app, shared by every session"""
+    return start_claim_retention()
+
+
+@st.cache_resource
+def get_report_store_cleanup():
+    """One cleanup worker for the app's report store"""
+    return get_artifact_store().start_cleanup_worker()
+
+
+agents = {}
+if not service_url:
+    with st.spinner("Loading AI agents..."):
+        agents = get_agents()
+    get_claim_retention()
+get_report_store_cleanup()
+
+
+@st.cache_data(ttl=int(os.getenv("SERVICE_HEALTH_TTL_SECONDS", 30)), show_spinner=False)
+def get_cached_service_health(url):
+    """The service's /health, fetched at most once per TTL rather than on every rerun"""
+    return get_service_health(url)
+
+
+def render_pool_lines(pool_stats):
+    """One line per host with request count, latency and open connections"""
+    lines = []
+    for host, stats in sorted(pool_stats.items()):
+        versions = "/".join(sorted(stats["http_versions"])) or "-"
+        connections = stats["open_connections"] if stats["open_connections"] is not None else "?"
+        lines.append(f"• {host}: {stats['requests']} req, {stats['avg_latency_ms']:.0f} ms avg, "
+                     f"{connections} open ({versions})")
+    return lines
+
+
+def render_system_status(placeholder):
+    """Show live circuit breaker state for every model and tool backend, plus HTTP pool usage.
+    
+    In remote mode the agents run in the service's workers, so both come from its /health.
+    """
+    state_labels = {
+        "closed": "🟢 Active",
+        "half_open": "🟡 Probing",
+        "open": "🔴 Unavailable",
+    }
+    if service_url:
+        health = get_cached_service_health(service_url)
+        breaker_states = health.get("breakers", {}) if health else {}
+        pool_stats = health.get("http_pool", {}) if health else {}
+    else:
+        health = None
+        breaker_states = get_breaker_states()
+        pool_stats = get_pool_stats()
+    all_closed = all(info["state"] == "closed" for info in breaker_states.values())
+    if service_url and health is None:
+        headline = "⚠️ Pipeline service unreachable"
+    elif service_url and health.get("unavailable"):
+        headline = "🔴 Pipeline service unavailable"
+    else:
+        headline = "🟢 APIs Connected" if all_closed else "⚠️ Degraded"
+    
+    lines = []
+    for name, info in sorted(breaker_states.items()):
+        kind, _, backend = name.partition(":")
+        label = state_labels.get(info["state"], info["state"])
+        if info["calls"]:
+            label += f" ({info['failure_rate']:.0%} failing)"
+        lines.append(f"• {backend} ({kind}): {label}")
+    if not lines:
+        lines.append("• No backend calls yet")
+    pool_lines = render_pool_lines(pool_stats)
+    
+    placeholder.markdown(f"""
+    <div class="sidebar-info">
+        <strong>{headline}</strong><br>
+        {'<br>'.join(lines)}<br>
+        • Agents: {f'Remote ({service_url})' if service_url else 'Ready'}
+        {'<br><strong>🔌 HTTP Pool</strong><br>' + '<br>'.join(pool_lines) if pool_lines else ''}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+render_system_status(system_status_placeholder)
 
 
 col1, col2 = st.columns([2, 1])
@@ -225,47 +349,51 @@ if st.button("🚀 Start Research", type="primary", use_container_width=True):
     critique_container = st.container()
     synthesis_container = st.container()
     
+    phase_ui = {
+        "researcher": (progress_col1, "🔍 Researching...", "✅ Research Complete", 10, 33,
+                       "🔍 **Phase 1/3:** Researcher Agent is gathering comprehensive data..."),
+        "critic": (progress_col2, "🧐 Analyzing...", "✅ Analysis Complete", 33, 66,
+                   "🧐 **Phase 2/3:** Critic Agent is analyzing claims and validating data..."),
+        "synthesizer": (progress_col3, "✍️ Synthesizing...", "✅ Synthesis Complete", 66, 100,
+                        "✍️ **Phase 3/3:** Synthesizer Agent is creating comprehensive report..."),
+    }
+    
+    def on_pipeline_event(event):
+        if event["event"] not in ("phase_started", "phase_completed"):
+            return
+        column, running_label, done_label, start_progress, done_progress, status_text = phase_ui[event["phase"]]
+        with column:
+            if event["event"] == "phase_started":
+                st.markdown(f'<div class="status-badge status-running">{running_label}</div>', unsafe_allow_html=True)
+            else:
+                st.markdown(f'<div class="status-badge status-complete">{done_label}</div>', unsafe_allow_html=True)
+        if event["event"] == "phase_started":
+            status_placeholder.info(status_text)
+            progress_bar.progress(start_progress)
+        else:
+            progress_bar.progress(done_progress)
+    
     try:
+        if service_url:
+            result = run_remote_pipeline(service_url, query, on_event=on_pipeline_event,
+                                         client_id=st.session_state.client_id,
+                                         deadline_seconds=time_budget, incremental=incremental_mode,
+                                         sharded_critic=sharded_critic, shard_size=shard_size,
+                                         critic_concurrency=critic_concurrency, structured=structured_claims)
+        else:
+            result = run_pipeline(agents, query, on_event=on_pipeline_event,
+                                  budget=RunBudget.from_env(time_budget), incremental=incremental_mode,
+                                  sharded_critic=sharded_critic, shard_size=shard_size,
+                                  critic_concurrency=critic_concurrency, structured=structured_claims)
         
-        with progress_col1:
-            st.markdown('<div class="status-badge status-running">🔍 Researching...</div>', unsafe_allow_html=True)
-        
-        status_placeholder.info("🔍 **Phase 1/3:** Researcher Agent is gathering comprehensive data...")
-        progress_bar.progress(10)
-        
-        research = agents["researcher"].run({"input": query})
-        progress_bar.progress(33)
-        
-        with progress_col1:
-            st.markdown('<div class="status-badge status-complete">✅ Research Complete</div>', unsafe_allow_html=True)
-        
-        
-        with progress_col2:
-            st.markdown('<div class="status-badge status-running">🧐 Analyzing...</div>', unsafe_allow_html=True)
-        
-        status_placeholder.info("🧐 **Phase 2/3:** Critic Agent is analyzing claims and validating data...")
-        
-        critique = agents["critic"].run({"input": f"Analyze this research: {research}"})
-        progress_bar.progress(66)
-        
-        with progress_col2:
-            st.markdown('<div class="status-badge status-complete">✅ Analysis Complete</div>', unsafe_allow_html=True)
-        
-        
-        with progress_col3:
-            st.markdown('<div class="status-badge status-running">✍️ Synthesizing...</div>', unsafe_allow_html=True)
-        
-        status_placeholder.info("✍️ **Phase 3/3:** Synthesizer Agent is creating comprehensive report...")
-        
-        synthesis = agents["synthesizer"].run({
-            "input": f"Create final report based on research: {research} and critique: {critique}"
-        })
-        progress_bar.progress(100)
-        
-        with progress_col3:
-            st.markdown('<div class="status-badge status-complete">✅ Synthesis Complete</div>', unsafe_allow_html=True)
+        research = result["research"]
+        critique = result["critique"]
+        synthesis = result["synthesis"]
         
         status_placeholder.success("🎉 **Research Pipeline Complete!** All agents have finished processing.")
+        # The run changed the workers' stats; refresh them now instead of waiting for the TTL
+        get_cached_service_health.clear()
+        render_system_status(system_status_placeholder)
         
         
         tab1, tab2, tab3, tab4 = st.tabs(["📋 Final Report", "📊 Research Data", "🔍 Critical Analysis", "⚙️ Process Details"])
@@ -274,18 +402,29 @@ if st.button("🚀 Start Research", type="primary", use_container_width=True):
             st.markdown("### 📋 Comprehensive Research Report")
             
             
-            verification_data = agents["researcher"].claim_tracker.get_verification_report()
+            verification_data = result["verification_data"]
             
             
-            formatted_report = format_report(research, critique, synthesis, verification_data)
-            st.markdown(formatted_report, unsafe_allow_html=True)
+            if service_url and result.get("report_id"):
+                # The worker already stored the report; read it back from the service
+                report_store = RemoteReportStore(service_url)
+                report_id = result["report_id"]
+            else:
+                report_store = get_artifact_store()
+                report_id = store_report(research, critique, synthesis, verification_data,
+                                         result.get("structured_claims"), store=report_store)
+            for section in report_store.manifest(report_id)["sections"]:
+                if section["kind"] == "image":
+                    st.image(report_store.read_bytes(section["digest"]), caption=section["alt"], width=500)
+                else:
+                    st.markdown("".join(report_store.iter_text(section["digest"])), unsafe_allow_html=True)
             
             
             st.download_button(
                 label="📥 Download Report",
-                data=formatted_report,
-                file_name=f"research_report_{int(time.time())}.html",
-                mime="text/html"
+                data=report_store.read_export(report_id, report_format),
+                file_name=f"research_report_{report_id[:12]}.{report_format}",
+                mime=FORMATS[report_format]
             )
         
         with tab2:
@@ -314,6 +453,35 @@ if st.button("🚀 Start Research", type="primary", use_container_width=True):
                     st.metric("Sources Cited", len(verification_data.get('sources', [])))
                 with col3:
                     st.metric("Confidence Score", f"{verification_data.get('confidence', 0):.1%}")
+            
+            incremental_stats = result.get("incremental")
+            if incremental_stats:
+                st.markdown("### ♻️ Incremental Research")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Claims Reused", incremental_stats["fresh"])
+                with col2:
+                    st.metric("Stale Claims Re-checked", incremental_stats["stale"])
+            
+            tool_memo = result.get("tool_memo")
+            if tool_memo and tool_memo["tool_calls"]:
+                st.markdown("### ♻️ Tool Call Memo")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Tool Calls", tool_memo["tool_calls"])
+                with col2:
+                    st.metric("Calls Saved", tool_memo["calls_saved"])
+            
+            run_budget = result.get("budget")
+            if run_budget:
+                st.markdown("### ⏱️ Run Budget")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Elapsed", f"{run_budget['elapsed_seconds']:.0f}s / {run_budget['deadline_seconds']:.0f}s")
+                with col2:
+                    st.metric("Tokens Used", run_budget["tokens_used"])
+                with col3:
+                    st.metric("LLM Requests", run_budget["requests_used"])
     
     except Exception as e:
         st.error(f"❌ **Research Error:** {str(e)}")
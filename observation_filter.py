@@ -0,0 +1,163 @@
+import ast
+import math
+import os
+import re
+from collections import Counter
+
+from corpus import tokenize
+from run_context import current_run, current_agent
+
+# Post-processing of raw tool observations before they reach the agent
+# scratchpad: split into passages, rank them against the query with BM25,
+# drop passages already seen earlier in the run, and keep the best ones
+# within a per-observation token budget.
+
+HEADER_PREFIXES = ("Page:", "Title:", "Published:", "Authors:", "Source:")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+def _split_blocks(text):
+    """(header, body) blocks; Tavily result lists become one block per URL"""
+    try:
+        parsed = ast.literal_eval(text)
+        if isinstance(parsed, list) and all(isinstance(item, dict) for item in parsed):
+            return [(f"Source: {item.get('url')}", str(item.get("content", ""))) for item in parsed]
+    except (ValueError, SyntaxError):
+        pass
+
+    blocks = []
+    for block in re.split(r"\n\s*\n", text):
+        header_lines, body_lines = [], []
+        for line in block.splitlines():
+            if line.startswith(HEADER_PREFIXES):
+                header_lines.append(line.strip())
+            elif line.startswith("Summary:"):
+                body_lines.append(line[len("Summary:"):].strip())
+            else:
+                body_lines.append(line.strip())
+        if body_lines:
+            blocks.append((" | ".join(h for h in header_lines if h), " ".join(body_lines)))
+    return blocks
+
+
+def split_passages(text, max_words=80):
+    """Sentence windows of up to max_words, each tagged with its block header"""
+    passages = []
+    for header, body in _split_blocks(text):
+        window, words = [], 0
+        for sentence in SENTENCE_SPLIT.split(body):
+            sentence_words = len(sentence.split())
+            if window and words + sentence_words > max_words:
+                passages.append((header, " ".join(window)))
+                window, words = [], 0
+            window.append(sentence)
+            words += sentence_words
+        if window:
+            passages.append((header, " ".join(window)))
+    return passages
+
+
+def bm25_scores(query, passages, k1=1.2, b=0.75):
+    """BM25 score of each passage text against the query, passages as the corpus"""
+    query_terms = set(tokenize(query))
+    docs = [Counter(tokenize(text)) for _, text in passages]
+    if not docs or not query_terms:
+        return [0.0] * len(docs)
+    n = len(docs)
+    avg_len = (sum(sum(doc.values()) for doc in docs) / n) or 1.0
+    df = Counter(term for doc in docs for term in query_terms if term in doc)
+    idf = {term: math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5)) for term in query_terms}
+    scores = []
+    for doc in docs:
+        length_norm = k1 * (1 - b + b * sum(doc.values()) / avg_len)
+        scores.append(sum(
+            idf[term] * doc[term] * (k1 + 1) / (doc[term] + length_norm)
+            for term in query_terms if term in doc
+        ))
+    return scores
+
+
+def shingles(text, size=3):
+    words = tokenize(text)
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _is_near_duplicate(fingerprint, seen, threshold):
+    for other in seen:
+        union = len(fingerprint | other)
+        if union and len(fingerprint & other) / union >= threshold:
+            return True
+    return False
+
+
+def filter_observation(query, observation, token_budget=None, dedup_threshold=0.8):
+    """Top query-relevant, non-duplicate passages of an observation within the token budget"""
+    if token_budget is None:
+        token_budget = int(os.getenv("OBSERVATION_TOKEN_BUDGET", 600))
+    if not isinstance(observation, str) or observation.startswith(("❌", "⚠️")):
+        return observation
+
+    passages = split_passages(observation)
+    if not passages:
+        return observation
+
+    run = current_run()
+    search_query = f"{query} {run.query}" if run is not None and run.query else query
+    scores = bm25_scores(search_query, passages)
+    ranked = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+    if scores[ranked[0]] > 0:
+        ranked = [i for i in ranked if scores[i] > 0]
+
+    seen = run.seen_for(current_agent()) if run is not None else []
+    selected, fingerprints, used_tokens, dropped_duplicates = [], [], 0, 0
+    for i in ranked:
+        header, text = passages[i]
+        fingerprint = shingles(text)
+        if _is_near_duplicate(fingerprint, fingerprints, dedup_threshold):
+            dropped_duplicates += 1
+            continue
+        if run is not None:
+            with run.lock:
+                duplicate = _is_near_duplicate(fingerprint, seen, dedup_threshold)
+            if duplicate:
+                dropped_duplicates += 1
+                continue
+        cost = estimate_tokens(text) + estimate_tokens(header)
+        if selected and used_tokens + cost > token_budget:
+            continue
+        if cost > token_budget:
+            text = text[:token_budget * 4].rsplit(" ", 1)[0] + " ..."
+            passages[i] = (header, text)
+            cost = token_budget
+        selected.append(i)
+        fingerprints.append(fingerprint)
+        used_tokens += cost
+
+    if run is not None:
+        with run.lock:
+            seen.extend(fingerprints)
+
+    if not selected:
+        return "All results from this search were already seen earlier in this research run."
+
+    # Present kept passages in their original order, grouped under their headers
+    lines, last_header = [], None
+    for i in sorted(selected):
+        header, text = passages[i]
+        if header and header != last_header:
+            lines.append(f"\n{header}")
+            last_header = header
+        lines.append(f"- {text}")
+    skipped = len(passages) - len(selected)
+    if skipped:
+        note = f"{skipped} less relevant passages omitted"
+        if dropped_duplicates:
+            note += f", {dropped_duplicates} already seen"
+        lines.append(f"({note})")
+    return "\n".join(lines).strip()
@@ -0,0 +1,140 @@
+from agent_system import ResearchAgent
+from run_context import RunContext, run_scope
+from budget import RunBudget
+from sharded_critic import run_sharded_critic
+from structured_claims import claim_text
+from tool_memo import memo_for
+
+# Researcher -> critic -> synthesizer, shared by the Streamlit app and the
+# headless service. Progress is reported through an optional on_event
+# callback so each front end can render it its own way.
+
+PHASES = ["researcher", "critic", "synthesizer"]
+
+# Incremental mode skips the researcher outright when at least this many
+# fresh claims already cover the query and none are stale
+INCREMENTAL_SKIP_MIN_FRESH = 12
+
+# Share of the then-remaining run budget each phase may use; the synthesizer gets the rest
+PHASE_BUDGET_SHARES = {"researcher": 0.45, "critic": 0.5, "synthesizer": 1.0}
+
+
+def create_agents(groq_api_key):
+    """Build the three pipeline agents (retention runs separately, see start_claim_retention)"""
+    return {
+        "researcher": ResearchAgent("researcher", groq_api_key),
+        "critic": ResearchAgent("critic", groq_api_key),
+        "synthesizer": ResearchAgent("synthesizer", groq_api_key)
+    }
+
+
+def _bullets(claims):
+    return "\n".join(f"- {claim['claim']}" for claim in claims)
+
+
+def build_incremental_input(query, fresh, stale):
+    """Researcher prompt that asks only for gaps and re-checks of stale claims"""
+    sections = [query]
+    if fresh:
+        sections.append(f"Already established by earlier research (still current, do not re-research):\n{_bullets(fresh)}")
+    if stale:
+        sections.append(f"Re-verify these older claims, which may be out of date:\n{_bullets(stale)}")
+    sections.append("Research only what is missing or outdated above. Do not repeat the established claims.")
+    return "\n\n".join(sections)
+
+
+def run_pipeline(agents, query, on_event=None, budget=None, incremental=False,
+                 sharded_critic=False, shard_size=None, critic_concurrency=None, structured=False):
+    """Run the full pipeline for one query and return all phase outputs.
+    
+    `budget` (a RunBudget, default from the environment) bounds the whole run;
+    each phase is given a slice of whatever is left when it starts. With
+    `incremental`, fresh claims from earlier runs are reused and the
+    researcher only fills gaps and re-checks stale claims. With
+    `sharded_critic`, claims are critiqued in concurrent batches. With
+    `structured`, the researcher records typed claims through a tool call and
+    comparison tables are rendered locally instead of by the synthesizer.
+    """
+    budget = budget or RunBudget.from_env()
+    
+    def phase_limit(phase):
+        return budget.remaining_seconds() * PHASE_BUDGET_SHARES[phase]
+
+    def emit(event, **data):
+        if on_event:
+            on_event({"event": event, **data})
+
+    tracker = agents["researcher"].claim_tracker
+    run_id = tracker.start_run(query)
+    emit("run_started", run_id=run_id)
+
+    fresh, stale = [], []
+    if incremental:
+        fresh, stale = tracker.classify_freshness(tracker.find_related_claims(query, exclude_run_id=run_id))
+        tracker.reuse_claims(fresh, run_id)
+        emit("incremental_plan", fresh=len(fresh), stale=len(stale))
+
+    run_context = RunContext(run_id, query, budget)
+    with run_scope(run_context):
+        emit("phase_started", phase="researcher")
+        if incremental and not stale and len(fresh) >= INCREMENTAL_SKIP_MIN_FRESH:
+            research = "All relevant findings are covered by current claims from earlier research."
+        else:
+            research_input = build_incremental_input(query, fresh, stale) if fresh or stale else query
+            research = agents["researcher"].run({"input": research_input}, run_id=run_id,
+                                                time_limit=phase_limit("researcher"),
+                                                structured=structured)
+        if stale and not research.startswith(("❌", "⏱️")):
+            # The stale claims were just re-checked; don't offer them for reuse again
+            tracker.supersede_claims(stale)
+        structured_claims = list(run_context.structured_claims)
+        if structured_claims:
+            claim_lines = "\n".join(f"- {claim_text(claim)}" for claim in structured_claims)
+            research = f"{research}\n\nRecorded claims:\n{claim_lines}"
+        emit("phase_completed", phase="researcher", output=research)
+
+        reused = ""
+        if fresh:
+            reused = f"\n\nFindings reused from earlier research (already reviewed, still current):\n{_bullets(fresh)}"
+
+        emit("phase_started", phase="critic")
+        if sharded_critic:
+            claims = ([claim_text(claim) for claim in structured_claims]
+                      or agents["critic"].claim_tracker.extract_claims(research))
+            # Reused claims are critiqued too, as they are on the single-critic path
+            claims = list(dict.fromkeys(claims + [claim["claim"] for claim in fresh]))
+            critique = run_sharded_critic(agents["critic"], f"{research}{reused}", time_limit=phase_limit("critic"),
+                                          on_event=on_event, shard_size=shard_size,
+                                          concurrency=critic_concurrency, claims=claims)
+        else:
+            critique = agents["critic"].run({"input": f"Analyze this research: {research}{reused}"},
+                                           time_limit=phase_limit("critic"))
+        emit("phase_completed", phase="critic", output=critique)
+
+        emit("phase_started", phase="synthesizer")
+        table_note = ""
+        if structured_claims:
+            table_note = ("\n\nComparison tables are rendered separately from the recorded claims. "
+                          "Do not produce tables; give verdicts on contested claims and concise recommendations.")
+        synthesis = agents["synthesizer"].run({
+            "input": f"Create final report based on research: {research}{reused} and critique: {critique}{table_note}"
+        }, time_limit=phase_limit("synthesizer"))
+        emit("phase_completed", phase="synthesizer", output=synthesis)
+
+        return {
+            "run_id": run_id,
+            "query": query,
+            "research": research,
+            "critique": critique,
+            "synthesis": synthesis,
+            "verification_data": agents["researcher"].claim_tracker.get_verification_report(run_id=run_id),
+            "budget": budget.summary(),
+            "structured_claims": structured_claims,
+            "tool_memo": memo_for(run_context).stats(),
+            "incremental": {"fresh": len(fresh), "stale": len(stale)} if incremental else None
+        }
+
+
+def close_agents(agents):
+    for agent in agents.values():
+        agent.close()
@@ -0,0 +1,68 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+
+# State scoped to one pipeline run. Agents and tools are shared across runs
+# (and sessions), so anything per-run travels in a context variable that the
+# pipeline sets and tool wrappers read at call time.
+
+
+class RunContext:
+    def __init__(self, run_id=None, query=None, budget=None):
+        self.run_id = run_id
+        self.query = query
+        self.budget = budget
+        # Typed claims the researcher recorded through the record_claims tool
+        self.structured_claims = []
+        self.lock = threading.Lock()
+        # Fingerprints of passages already shown, per agent scratchpad
+        self.seen_passages = {}
+        # Tool-call memo shared by every agent of the run (tool_memo.memo_for)
+        self.tool_memo = None
+        # Sources (URLs, backend names) tool observations came from, per agent scratchpad
+        self.tool_sources = {}
+
+    def seen_for(self, agent_scope):
+        with self.lock:
+            return self.seen_passages.setdefault(agent_scope, [])
+
+    def note_sources(self, agent_scope, sources):
+        with self.lock:
+            scope_sources = self.tool_sources.setdefault(agent_scope, {})
+            scope_sources.update(dict.fromkeys(sources))
+
+    def sources_for(self, agent_scope):
+        with self.lock:
+            return list(self.tool_sources.get(agent_scope, {}))
+
+
+_current = contextvars.ContextVar("run_context", default=None)
+_agent = contextvars.ContextVar("agent_scope", default=None)
+
+
+def current_run():
+    """The active RunContext, or None outside a pipeline run"""
+    return _current.get()
+
+
+@contextmanager
+def run_scope(context):
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
+
+
+def current_agent():
+    """Name of the agent whose executor is running tools, if any"""
+    return _agent.get()
+
+
+@contextmanager
+def agent_scope(name):
+    token = _agent.set(name)
+    try:
+        yield name
+    finally:
+        _agent.reset(token)
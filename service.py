@@ -0,0 +1,667 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from artifact_store import FORMATS, ArtifactNotFound, get_artifact_store
+from circuit_breaker import merge_breaker_states
+from http_pool import merge_pool_stats
+
+# Headless pipeline service. Jobs are queued per client and handed out
+# round-robin to a pool of worker processes, each owning its own agents.
+#
+#   POST /jobs                 {"query", "client_id", "deadline_seconds", "options"} -> 202 {"job_id"}
+#                              options: incremental, sharded_critic, shard_size, critic_concurrency, structured
+#   GET  /jobs/<id>            status
+#   GET  /jobs/<id>/result     result once finished (202 while pending)
+#   GET  /jobs/<id>/stream     server-sent events until the job finishes
+#   GET  /reports/<id>         stored report, streamed (?format=md|html|json, default md)
+#   GET  /reports/<id>/manifest the report's sections (names, kinds, blob digests)
+#   GET  /objects/<digest>     one decompressed section blob, streamed
+#   GET  /health               queue depth and worker pool state
+
+TERMINAL_STATES = ("completed", "failed")
+
+# The stream sends a keep-alive at least every 15s, so a longer silence means the service is gone
+STREAM_READ_TIMEOUT = 60
+# Extra time a client waits past its own deadline before giving up on a job
+CLIENT_DEADLINE_GRACE = 60
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class FairJobQueue:
+    """Bounded per-client queues served round-robin, so one busy client
+    cannot starve the others"""
+
+    def __init__(self, max_pending=32, max_per_client=8):
+        self.max_pending = max_pending
+        self.max_per_client = max_per_client
+        self.queues = OrderedDict()
+        self.pending = 0
+        self.cond = threading.Condition()
+
+    def put(self, client_id, item):
+        with self.cond:
+            client_queue = self.queues.get(client_id)
+            if self.pending >= self.max_pending:
+                raise QueueFull("Service queue is full")
+            if client_queue is not None and len(client_queue) >= self.max_per_client:
+                raise QueueFull(f"Too many pending jobs for client {client_id}")
+            if client_queue is None:
+                client_queue = self.queues[client_id] = deque()
+            client_queue.append(item)
+            self.pending += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.pending > 0, timeout):
+                return None
+            client_id, client_queue = next(iter(self.queues.items()))
+            item = client_queue.popleft()
+            self.pending -= 1
+            # Rotate the client to the back of the line
+            del self.queues[client_id]
+            if client_queue:
+                self.queues[client_id] = client_queue
+            return item
+
+    def put_back(self, client_id, item):
+        """Return an item taken by get() to the front of the line (no limits apply)"""
+        with self.cond:
+            client_queue = self.queues.get(client_id)
+            if client_queue is None:
+                client_queue = self.queues[client_id] = deque()
+            client_queue.appendleft(item)
+            self.queues.move_to_end(client_id, last=False)
+            self.pending += 1
+            self.cond.notify()
+
+    def drain(self):
+        """Remove and return every pending item"""
+        with self.cond:
+            items = [item for client_queue in self.queues.values() for item in client_queue]
+            self.queues.clear()
+            self.pending = 0
+            return items
+
+    def depth(self):
+        with self.cond:
+            return {"pending": self.pending, "clients": {c: len(q) for c, q in self.queues.items()}}
+
+
+def _worker_main(task_queue, event_queue):
+    """Worker process: builds its own agents once, then runs jobs until told to stop"""
+    from dotenv import load_dotenv
+    from pipeline import create_agents, run_pipeline, close_agents
+    from budget import RunBudget
+    from visualization import store_report
+    from http_pool import get_pool_stats
+    from circuit_breaker import get_breaker_states
+
+    def report_stats():
+        # Pools and breakers live in the workers; the parent aggregates them for /health
+        event_queue.put((None, {"event": "worker_stats", "pid": pid,
+                                "pool": get_pool_stats(), "breakers": get_breaker_states()}))
+
+    load_dotenv()
+    pid = os.getpid()
+    try:
+        agents = create_agents(os.getenv("GROQ_API_KEY"))
+    except Exception as e:
+        event_queue.put((None, {"event": "worker_failed", "pid": pid, "error": str(e)}))
+        return
+    event_queue.put((None, {"event": "worker_ready", "pid": pid}))
+    report_stats()
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            job_id, query, deadline_seconds, options = task
+            event_queue.put((job_id, {"event": "started", "pid": pid}))
+            try:
+                result = run_pipeline(agents, query, on_event=lambda e: event_queue.put((job_id, e)),
+                                      budget=RunBudget.from_env(deadline_seconds), **options)
+                try:
+                    result["report_id"] = store_report(result["research"], result["critique"], result["synthesis"],
+                                                       result["verification_data"], result.get("structured_claims"))
+                except Exception as e:
+                    print(f"Warning: Could not store report for job {job_id}: {e}")
+                event_queue.put((job_id, {"event": "completed", "result": result}))
+            except Exception as e:
+                event_queue.put((job_id, {"event": "failed", "error": str(e)}))
+            report_stats()
+    finally:
+        close_agents(agents)
+
+
+class PipelineService:
+    def __init__(self, workers=None, max_pending=32, max_per_client=8, job_ttl_seconds=3600,
+                 max_start_failures=5):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.max_start_failures = max_start_failures
+        self.job_ttl_seconds = job_ttl_seconds
+        self.scheduler = FairJobQueue(max_pending, max_per_client)
+        self.jobs = {}
+        self.jobs_cond = threading.Condition()
+
+        ctx = multiprocessing.get_context("spawn")
+        self.ctx = ctx
+        self.event_queue = ctx.Queue()
+        self.processes = []
+        # Each worker has its own task queue, so the service knows which worker
+        # holds a job from the moment it is dispatched
+        self.task_queues = {}
+        # pid -> job handed to that worker; a worker that dies before reporting
+        # "started" still fails its job and frees its slot
+        self.running_on = {}
+        # Jobs are only handed to ready workers with nothing assigned
+        self.ready_workers = set()
+        # Latest HTTP pool stats and breaker states reported by each worker
+        self.pool_stats = {}
+        self.breaker_states = {}
+        # Consecutive workers that died before becoming ready; drives restart backoff
+        self.start_failures = 0
+        self.next_restart_at = 0.0
+        self.unavailable = None
+        self.retention_tracker = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        from verification import start_claim_retention
+
+        # Retention runs once here, never in the workers that share the database
+        self.retention_tracker = start_claim_retention()
+        get_artifact_store().start_cleanup_worker()
+        for _ in range(self.worker_count):
+            self._spawn_worker()
+        threading.Thread(target=self._dispatch_loop, name="dispatcher", daemon=True).start()
+        threading.Thread(target=self._collect_loop, name="collector", daemon=True).start()
+        threading.Thread(target=self._monitor_loop, name="monitor", daemon=True).start()
+
+    def _spawn_worker(self):
+        task_queue = self.ctx.Queue()
+        process = self.ctx.Process(target=_worker_main, args=(task_queue, self.event_queue), daemon=True)
+        process.start()
+        with self.jobs_cond:
+            self.task_queues[process.pid] = task_queue
+            self.processes.append(process)
+
+    def submit(self, query, client_id, deadline_seconds=None, options=None):
+        if self.unavailable:
+            raise ServiceUnavailable(self.unavailable)
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "client_id": client_id,
+            "query": query,
+            "deadline_seconds": deadline_seconds,
+            "options": options or {},
+            "status": "queued",
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "events": [],
+            "result": None,
+            "error": None,
+        }
+        with self.jobs_cond:
+            self.jobs[job_id] = job
+        try:
+            self.scheduler.put(client_id, job_id)
+        except QueueFull:
+            with self.jobs_cond:
+                del self.jobs[job_id]
+            raise
+        return job_id
+
+    def get_job(self, job_id):
+        with self.jobs_cond:
+            return self.jobs.get(job_id)
+
+    def job_status(self, job):
+        return {
+            key: job[key] for key in
+            ("job_id", "client_id", "query", "status", "submitted_at", "finished_at", "error")
+        }
+
+    def wait_for_events(self, job_id, start, timeout=15):
+        """Events after index `start`, blocking until there are some or the job ends"""
+        with self.jobs_cond:
+            self.jobs_cond.wait_for(
+                lambda: job_id not in self.jobs
+                or len(self.jobs[job_id]["events"]) > start
+                or self.jobs[job_id]["status"] in TERMINAL_STATES,
+                timeout
+            )
+            job = self.jobs.get(job_id)
+            if job is None:
+                return [], True
+            return job["events"][start:], job["status"] in TERMINAL_STATES
+
+    def _free_worker(self):
+        """A ready worker with no job assigned, or None"""
+        return next((pid for pid in self.ready_workers if pid not in self.running_on), None)
+
+    def _dispatch_loop(self):
+        while not self.stopping.is_set():
+            with self.jobs_cond:
+                if not self.jobs_cond.wait_for(lambda: self._free_worker() is not None, timeout=1):
+                    continue
+            job_id = self.scheduler.get(timeout=1)
+            if job_id is None:
+                continue
+            with self.jobs_cond:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                pid = self._free_worker()
+                if pid is None:
+                    # The free worker exited while we waited for a job
+                    self.scheduler.put_back(job["client_id"], job_id)
+                    continue
+                job["status"] = "dispatched"
+                self.running_on[pid] = job_id
+                deadline_seconds = job["deadline_seconds"]
+                if deadline_seconds is not None:
+                    # Time spent queued counts against the client's deadline
+                    deadline_seconds = max(1.0, deadline_seconds - (time.time() - job["submitted_at"]))
+                task = (job_id, job["query"], deadline_seconds, job["options"])
+                task_queue = self.task_queues[pid]
+            task_queue.put(task)
+
+    def _finish(self, job, status, result=None, error=None):
+        job["status"] = status
+        job["result"] = result
+        job["error"] = error
+        job["finished_at"] = time.time()
+
+    def _collect_loop(self):
+        while not self.stopping.is_set():
+            try:
+                job_id, event = self.event_queue.get(timeout=1)
+            except queue.Empty:
+                self._evict_expired()
+                continue
+            with self.jobs_cond:
+                if job_id is None:
+                    if event["event"] == "worker_ready":
+                        self.ready_workers.add(event["pid"])
+                        self.start_failures = 0
+                        self.jobs_cond.notify_all()
+                    elif event["event"] == "worker_stats":
+                        self.pool_stats[event["pid"]] = event["pool"]
+                        self.breaker_states[event["pid"]] = event["breakers"]
+                    else:
+                        print(f"❌ Worker {event['pid']} failed to start: {event['error']}")
+                    continue
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                if event["event"] == "started":
+                    job["status"] = "running"
+                elif event["event"] == "completed":
+                    self._finish(job, "completed", result=event["result"])
+                    self._clear_running(job_id)
+                elif event["event"] == "failed":
+                    self._finish(job, "failed", error=event["error"])
+                    self._clear_running(job_id)
+                job["events"].append(event)
+                self.jobs_cond.notify_all()
+
+    def _clear_running(self, job_id):
+        for pid, running_job in list(self.running_on.items()):
+            if running_job == job_id:
+                del self.running_on[pid]
+
+    def _fail_job(self, job, error):
+        job["events"].append({"event": "failed", "error": error})
+        self._finish(job, "failed", error=error)
+
+    def _monitor_loop(self):
+        """Replace crashed workers with backoff and fail the jobs they were running"""
+        while not self.stopping.wait(5):
+            for process in list(self.processes):
+                if process.is_alive():
+                    continue
+                with self.jobs_cond:
+                    self.processes.remove(process)
+                    self.task_queues.pop(process.pid, None)
+                    if process.pid in self.ready_workers:
+                        self.ready_workers.discard(process.pid)
+                    else:
+                        self.start_failures += 1
+                        self.next_restart_at = time.time() + min(300, 5 * 2 ** self.start_failures)
+                    self.pool_stats.pop(process.pid, None)
+                    self.breaker_states.pop(process.pid, None)
+                    job_id = self.running_on.pop(process.pid, None)
+                    job = self.jobs.get(job_id) if job_id else None
+                    if job is not None and job["status"] not in TERMINAL_STATES:
+                        self._fail_job(job, f"Worker {process.pid} exited with code {process.exitcode}")
+                    self.jobs_cond.notify_all()
+                print(f"⚠️ Worker {process.pid} exited with code {process.exitcode}")
+
+            if self.stopping.is_set():
+                return
+            if self.start_failures >= self.max_start_failures and not self.ready_workers:
+                self._give_up()
+                return
+            missing = self.worker_count - len(self.processes)
+            if missing and time.time() >= self.next_restart_at:
+                print(f"🔁 Starting {missing} replacement worker(s)")
+                for _ in range(missing):
+                    self._spawn_worker()
+
+    def _give_up(self):
+        """No worker could start: refuse new jobs and fail everything waiting"""
+        error = f"No pipeline worker could start after {self.start_failures} attempts"
+        print(f"❌ {error}; the service will reject new jobs")
+        with self.jobs_cond:
+            self.unavailable = error
+            self.running_on.clear()
+            for job_id in self.scheduler.drain():
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    self._fail_job(job, error)
+            for job in self.jobs.values():
+                if job["status"] in ("dispatched", "running"):
+                    self._fail_job(job, error)
+            self.jobs_cond.notify_all()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.job_ttl_seconds
+        with self.jobs_cond:
+            for job_id in [job_id for job_id, job in self.jobs.items()
+                           if job["finished_at"] and job["finished_at"] < cutoff]:
+                del self.jobs[job_id]
+
+    def health(self):
+        return {
+            "workers": len(self.processes),
+            "workers_ready": len(self.ready_workers),
+            "start_failures": self.start_failures,
+            "unavailable": self.unavailable,
+            "running": len(self.running_on),
+            "idle_workers": len(self.ready_workers - set(self.running_on)),
+            "queue": self.scheduler.depth(),
+            "http_pool": merge_pool_stats(list(self.pool_stats.values())),
+            "breakers": merge_breaker_states(list(self.breaker_states.values())),
+        }
+
+    def stop(self):
+        self.stopping.set()
+        if self.retention_tracker is not None:
+            self.retention_tracker.close()
+        for task_queue in list(self.task_queues.values()):
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=10)
+
+
+def make_handler(service):
+    class PipelineRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/jobs":
+                return self._send_json(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                return self._send_json(400, {"error": "Invalid JSON body"})
+            query = (payload.get("query") or "").strip()
+            if not query:
+                return self._send_json(400, {"error": "Missing query"})
+            client_id = payload.get("client_id") or self.client_address[0]
+            try:
+                deadline_seconds = float(payload["deadline_seconds"]) if payload.get("deadline_seconds") else None
+            except (TypeError, ValueError):
+                return self._send_json(400, {"error": "Invalid deadline_seconds"})
+            try:
+                options = parse_pipeline_options(payload)
+            except (TypeError, ValueError):
+                return self._send_json(400, {"error": "Invalid pipeline options"})
+            try:
+                job_id = service.submit(query, client_id, deadline_seconds, options)
+            except QueueFull as e:
+                return self._send_json(429, {"error": str(e)}, headers={"Retry-After": "5"})
+            except ServiceUnavailable as e:
+                return self._send_json(503, {"error": str(e)})
+            self._send_json(202, {"job_id": job_id})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            if parts == ["health"]:
+                return self._send_json(200, service.health())
+            if len(parts) == 2 and parts[0] == "reports":
+                report_format = parse_qs(url.query).get("format", ["md"])[0]
+                return self._send_report(parts[1], report_format)
+            if len(parts) == 3 and parts[0] == "reports" and parts[2] == "manifest":
+                try:
+                    return self._send_json(200, get_artifact_store().manifest(parts[1]))
+                except ArtifactNotFound:
+                    return self._send_json(404, {"error": "Unknown report"})
+            if len(parts) == 2 and parts[0] == "objects":
+                return self._send_object(parts[1])
+            if len(parts) < 2 or parts[0] != "jobs":
+                return self._send_json(404, {"error": "Not found"})
+            job = service.get_job(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": "Unknown job"})
+
+            if len(parts) == 2:
+                return self._send_json(200, service.job_status(job))
+            if parts[2] == "result":
+                if job["status"] == "completed":
+                    return self._send_json(200, job["result"])
+                if job["status"] == "failed":
+                    return self._send_json(500, {"error": job["error"]})
+                return self._send_json(202, service.job_status(job))
+            if parts[2] == "stream":
+                return self._stream(job["job_id"])
+            self._send_json(404, {"error": "Not found"})
+
+        def _send_report(self, report_id, report_format):
+            """Stream a stored report straight from the artifact store"""
+            if report_format not in FORMATS:
+                return self._send_json(400, {"error": f"Unknown format, use one of {', '.join(FORMATS)}"})
+            store = get_artifact_store()
+            try:
+                store.manifest(report_id)
+            except ArtifactNotFound:
+                return self._send_json(404, {"error": "Unknown report"})
+            self.send_response(200)
+            self.send_header("Content-Type", f"{FORMATS[report_format]}; charset=utf-8")
+            self.send_header("Content-Disposition",
+                             f'attachment; filename="research_report_{report_id[:12]}.{report_format}"')
+            self.end_headers()
+            try:
+                for chunk in store.iter_export(report_id, report_format):
+                    self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def _send_object(self, digest):
+            store = get_artifact_store()
+            chunks = store.iter_bytes(digest)
+            try:
+                first = next(chunks, b"")
+            except ArtifactNotFound:
+                return self._send_json(404, {"error": "Unknown object"})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            try:
+                self.wfile.write(first)
+                for chunk in chunks:
+                    self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def _stream(self, job_id):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            sent = 0
+            try:
+                while True:
+                    events, finished = service.wait_for_events(job_id, sent)
+                    for event in events:
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    sent += len(events)
+                    if not events:
+                        self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    if finished and not events:
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def log_message(self, format, *args):
+            pass
+
+    return PipelineRequestHandler
+
+
+def parse_pipeline_options(payload):
+    """run_pipeline keyword options accepted from a job payload"""
+    options = payload.get("options") or {}
+    parsed = {
+        "incremental": bool(options.get("incremental")),
+        "sharded_critic": bool(options.get("sharded_critic")),
+        "structured": bool(options.get("structured")),
+    }
+    for key in ("shard_size", "critic_concurrency"):
+        if options.get(key) is not None:
+            parsed[key] = max(1, int(options[key]))
+    return parsed
+
+
+def get_service_health(service_url, timeout=2.0):
+    """The service's /health payload, or None when it cannot be reached"""
+    from http_pool import get_http_client
+
+    try:
+        response = get_http_client(urlparse(service_url).netloc).get(f"{service_url}/health", timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        print(f"Warning: Could not reach pipeline service health endpoint: {e}")
+        return None
+
+
+class RemoteReportStore:
+    """Read side of ArtifactStore for reports the service's workers stored"""
+
+    def __init__(self, service_url):
+        from http_pool import get_http_client
+
+        self.service_url = service_url
+        self.client = get_http_client(urlparse(service_url).netloc)
+
+    def _get(self, path, **params):
+        response = self.client.get(f"{self.service_url}{path}", params=params or None)
+        if response.status_code == 404:
+            raise ArtifactNotFound(path)
+        response.raise_for_status()
+        return response
+
+    def manifest(self, report_id):
+        return self._get(f"/reports/{report_id}/manifest").json()
+
+    def read_bytes(self, digest):
+        return self._get(f"/objects/{digest}").content
+
+    def iter_text(self, digest):
+        yield self.read_bytes(digest).decode()
+
+    def read_export(self, report_id, fmt="md"):
+        return self._get(f"/reports/{report_id}", format=fmt).content
+
+
+def run_remote_pipeline(service_url, query, on_event=None, client_id=None, deadline_seconds=None, **options):
+    """Thin client: submit a query to the service and follow its event stream"""
+    from http_pool import get_http_client
+
+    client = get_http_client(urlparse(service_url).netloc)
+    response = client.post(f"{service_url}/jobs", json={
+        "query": query, "client_id": client_id, "deadline_seconds": deadline_seconds,
+        "options": options
+    })
+    if response.status_code == 429:
+        raise Exception(f"Pipeline service is busy: {response.json().get('error')}")
+    if response.status_code == 503:
+        raise Exception(f"Pipeline service is unavailable: {response.json().get('error')}")
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+
+    import httpx
+
+    give_up_at = time.monotonic() + deadline_seconds + CLIENT_DEADLINE_GRACE if deadline_seconds else None
+    timeout = httpx.Timeout(30.0, read=STREAM_READ_TIMEOUT)
+    with client.stream("GET", f"{service_url}/jobs/{job_id}/stream", timeout=timeout) as stream:
+        for line in stream.iter_lines():
+            if give_up_at is not None and time.monotonic() > give_up_at:
+                raise Exception(f"Pipeline job {job_id} did not finish within its deadline")
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["event"] == "completed":
+                return event["result"]
+            if event["event"] == "failed":
+                raise Exception(event["error"])
+            if on_event:
+                on_event(event)
+    raise Exception("Pipeline service closed the stream before the job finished")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-agent research pipeline service")
+    parser.add_argument("--host", default=os.getenv("PIPELINE_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PIPELINE_SERVICE_PORT", 8765)))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-queue", type=int, default=32, help="Maximum pending jobs before returning 429")
+    parser.add_argument("--max-per-client", type=int, default=8, help="Maximum pending jobs per client")
+    args = parser.parse_args()
+
+    service = PipelineService(args.workers, args.max_queue, args.max_per_client)
+    service.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 Pipeline service on http://{args.host}:{args.port} with {service.worker_count} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
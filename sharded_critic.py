@@ -0,0 +1,110 @@
+import contextvars
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from corpus import tokenize
+
+# Sharded critic: the extracted research claims are split into batches that
+# are critiqued concurrently, each with its own small tool budget, and the
+# per-shard verdicts are merged into one deduplicated critique. Critique
+# latency then tracks the slowest shard instead of the whole research text.
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*)$")
+FAILED_PREFIXES = ("❌", "⏱️")
+
+
+def get_shard_config(shard_size=None, concurrency=None, shard_iterations=None):
+    """Shard settings, falling back to CRITIC_* environment variables"""
+    return {
+        "shard_size": shard_size or int(os.getenv("CRITIC_SHARD_SIZE", 8)),
+        "concurrency": concurrency or int(os.getenv("CRITIC_CONCURRENCY", 4)),
+        "shard_iterations": shard_iterations or int(os.getenv("CRITIC_SHARD_ITERATIONS", 3)),
+    }
+
+
+def shard_claims(claims, shard_size):
+    return [claims[i:i + shard_size] for i in range(0, len(claims), shard_size)]
+
+
+def _verdict_items(critique):
+    """Bullet items of one shard's critique; unbulleted output counts as one item"""
+    items = []
+    for line in critique.splitlines():
+        match = BULLET_PATTERN.match(line)
+        if match and match.group(1).strip():
+            items.append(match.group(1).strip())
+    if not items and critique.strip():
+        items.append(critique.strip())
+    return items
+
+
+def _is_duplicate(terms, seen_terms, threshold=0.8):
+    for other in seen_terms:
+        union = len(terms | other)
+        if union and len(terms & other) / union >= threshold:
+            return True
+    return False
+
+
+def merge_critiques(shard_outputs):
+    """One critique from the shard outputs, dropping repeated and near-repeated verdicts"""
+    merged, seen_terms, failures = [], [], 0
+    for output in shard_outputs:
+        if not output or output.startswith(FAILED_PREFIXES):
+            failures += 1
+            continue
+        for item in _verdict_items(output):
+            terms = set(tokenize(item))
+            if not terms or _is_duplicate(terms, seen_terms):
+                continue
+            seen_terms.append(terms)
+            merged.append(f"- {item}")
+    if failures:
+        merged.append(f"- ⚠️ {failures} of {len(shard_outputs)} claim batches could not be reviewed")
+    return "\n".join(merged) if merged else "No critique could be produced for the research claims."
+
+
+def run_sharded_critic(critic, research, time_limit=None, on_event=None, claims=None, **config):
+    """Critique the claims in `research` in concurrent batches and merge the verdicts.
+
+    `claims` skips extraction when the researcher already produced structured
+    claims. Falls back to a single critic run when there are too few to shard.
+    """
+    config = get_shard_config(**config)
+    if claims is None:
+        claims = critic.claim_tracker.extract_claims(research)
+    if len(claims) <= config["shard_size"]:
+        return critic.run({"input": f"Analyze this research: {research}"}, time_limit=time_limit)
+
+    shards = shard_claims(claims, config["shard_size"])
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+
+    def critique_shard(index, shard):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        bullets = "\n".join(f"- {claim}" for claim in shard)
+        output = critic.run(
+            {"input": f"Analyze these research claims (batch {index + 1} of {len(shards)}):\n{bullets}"},
+            time_limit=remaining,
+            max_iterations=config["shard_iterations"]
+        )
+        if on_event:
+            on_event({"event": "critic_shard_completed", "shard": index + 1, "shards": len(shards)})
+        return output
+
+    print(f"🧐 Critiquing {len(claims)} claims in {len(shards)} shards "
+          f"({config['concurrency']} at a time)")
+    with ThreadPoolExecutor(max_workers=config["concurrency"]) as pool:
+        # Each shard runs in a copy of the caller's context so it sees the run's budget and scope
+        futures = [
+            pool.submit(contextvars.copy_context().run, critique_shard, index, shard)
+            for index, shard in enumerate(shards)
+        ]
+        outputs = []
+        for future in futures:
+            try:
+                outputs.append(future.result())
+            except Exception as e:
+                outputs.append(f"❌ Critic shard failed: {e}")
+    return merge_critiques(outputs)
@@ -0,0 +1,93 @@
+from typing import List, Optional
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from run_context import current_run
+
+# Structured researcher output: instead of free-form bullets that have to be
+# re-parsed with regexes, the researcher records typed claims through a
+# tool call. They go straight into the ClaimTracker, and comparison tables
+# are rendered locally from them rather than regenerated by the LLM.
+
+
+class StructuredClaim(BaseModel):
+    subject: str = Field(description="Technology, product or entity the claim is about, e.g. 'SvelteKit'")
+    comparison: str = Field(description="Attribute being compared, e.g. 'bundle size' or 'SSR support'")
+    value: str = Field(description="Short value or finding for that attribute, e.g. '~30% smaller than Next.js'")
+    source_url: Optional[str] = Field(default=None, description="URL backing the claim, if known")
+
+
+class ClaimBatch(BaseModel):
+    claims: List[StructuredClaim] = Field(description="All claims found so far")
+
+
+def claim_to_dict(claim):
+    if hasattr(claim, "model_dump"):
+        return claim.model_dump()
+    return dict(claim)
+
+
+def claim_text(claim):
+    """One-line rendering of a structured claim for prompts and the claims table"""
+    text = f"{claim['subject']} — {claim['comparison']}: {claim['value']}"
+    if claim.get("source_url"):
+        text += f" ({claim['source_url']})"
+    return text
+
+
+def make_record_claims_tool(claim_tracker, sources="Researcher Agent"):
+    """Tool the researcher calls to hand over typed claims"""
+    def record_claims(claims):
+        records = [claim_to_dict(claim) for claim in claims]
+        run = current_run()
+        run_id = run.run_id if run is not None else None
+        claim_tracker.add_structured_claims(records, sources, run_id=run_id)
+        if run is not None:
+            with run.lock:
+                run.structured_claims.extend(records)
+        return f"Recorded {len(records)} claims."
+
+    return StructuredTool.from_function(
+        func=record_claims,
+        name="record_claims",
+        description="Record the research claims as structured data (subject, comparison, value, source_url). "
+                    "Call this once with every claim before giving your final answer.",
+        args_schema=ClaimBatch
+    )
+
+
+def _escape_cell(text):
+    return str(text).replace("|", "\\|").replace("\n", " ")
+
+
+def render_comparison_tables(claims):
+    """Markdown comparison table (subjects x compared attributes) plus its sources"""
+    if not claims:
+        return ""
+
+    subjects = list(dict.fromkeys(claim["subject"] for claim in claims))
+    comparisons = list(dict.fromkeys(claim["comparison"] for claim in claims))
+    cells, sources = {}, []
+    for claim in claims:
+        value = claim["value"]
+        url = claim.get("source_url")
+        if url:
+            if url not in sources:
+                sources.append(url)
+            value += f" [{sources.index(url) + 1}]"
+        key = (claim["subject"], claim["comparison"])
+        cells[key] = f"{cells[key]}; {value}" if key in cells else value
+
+    lines = [
+        "| Aspect | " + " | ".join(_escape_cell(subject) for subject in subjects) + " |",
+        "|---" * (len(subjects) + 1) + "|",
+    ]
+    for comparison in comparisons:
+        row = [_escape_cell(cells.get((subject, comparison), "—")) for subject in subjects]
+        lines.append(f"| {_escape_cell(comparison)} | " + " | ".join(row) + " |")
+
+    if sources:
+        lines.append("")
+        lines.extend(f"[{i}] {url}  " for i, url in enumerate(sources, 1))
+    return "\n".join(lines)
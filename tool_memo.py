@@ -0,0 +1,164 @@
+import os
+import threading
+
+from budget import current_budget
+from corpus import tokenize
+from run_context import current_agent, current_run
+from verification import URL_PATTERN
+
+# Run-scoped memo of tool calls. Researcher and critic share the search
+# tools, and within one executor the LLM often re-asks the same question in
+# other words. A query whose terms match an earlier call to the same tool
+# (same normalized text, high token-set overlap, or a subset of the earlier
+# query's terms) gets that call's observation back instead of a new request.
+
+UNCACHEABLE_PREFIXES = ("❌", "⚠️", "⏱️")
+# Sources noted per observation, so stored claims can be attributed to real sources
+MAX_NOTED_SOURCES = 5
+
+
+def get_memo_config():
+    """Memo settings, configurable through TOOL_MEMO_* environment variables"""
+    return {
+        "enabled": os.getenv("TOOL_MEMO_ENABLED", "1").lower() not in ("0", "false", "no"),
+        "similarity": float(os.getenv("TOOL_MEMO_SIMILARITY", 0.8)),
+        "min_subset_terms": int(os.getenv("TOOL_MEMO_MIN_SUBSET_TERMS", 2)),
+        "wait_seconds": float(os.getenv("TOOL_MEMO_WAIT_SECONDS", 30)),
+    }
+
+
+class _Entry:
+    def __init__(self, query, terms):
+        self.query = query
+        self.terms = terms
+        self.observation = None
+        self.done = threading.Event()
+
+
+class ToolCallMemo:
+    def __init__(self, similarity=0.8, min_subset_terms=2):
+        self.similarity = similarity
+        self.min_subset_terms = min_subset_terms
+        self.entries = {}
+        self.calls = {}
+        self.saved = {}
+        self.lock = threading.Lock()
+
+    def _match(self, tool_name, terms):
+        """Closest earlier call to the same tool that covers these terms, or None"""
+        best, best_score = None, 0.0
+        for entry in self.entries.get(tool_name, []):
+            if entry.terms == terms:
+                return entry
+            union = len(terms | entry.terms)
+            score = len(terms & entry.terms) / union if union else 0.0
+            subsumed = len(terms) >= self.min_subset_terms and terms <= entry.terms
+            if (score >= self.similarity or subsumed) and score > best_score:
+                best, best_score = entry, score
+        return best
+
+    def claim(self, tool_name, query):
+        """(entry, is_new): a matching earlier call, or a new pending entry the caller must fill"""
+        terms = frozenset(tokenize(query))
+        with self.lock:
+            self.calls[tool_name] = self.calls.get(tool_name, 0) + 1
+            entry = self._match(tool_name, terms) if terms else None
+            if entry is not None:
+                return entry, False
+            entry = _Entry(query, terms)
+            self.entries.setdefault(tool_name, []).append(entry)
+            return entry, True
+
+    def fill(self, tool_name, entry, observation):
+        """Record a finished call; failed observations are dropped so later calls retry"""
+        with self.lock:
+            if isinstance(observation, str) and not observation.startswith(UNCACHEABLE_PREFIXES):
+                entry.observation = observation
+            else:
+                self.entries[tool_name].remove(entry)
+        entry.done.set()
+
+    def record_saved(self, tool_name):
+        with self.lock:
+            self.saved[tool_name] = self.saved.get(tool_name, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            calls = sum(self.calls.values())
+            saved = sum(self.saved.values())
+            return {
+                "tool_calls": calls,
+                "calls_saved": saved,
+                "by_tool": {
+                    name: {"calls": count, "saved": self.saved.get(name, 0)}
+                    for name, count in self.calls.items()
+                },
+            }
+
+
+def memo_for(run):
+    """The run's tool-call memo, created on first use"""
+    with run.lock:
+        if run.tool_memo is None:
+            config = get_memo_config()
+            run.tool_memo = ToolCallMemo(config["similarity"], config["min_subset_terms"])
+        return run.tool_memo
+
+
+def _cached_note(tool_name, entry):
+    return (f"♻️ Cached {tool_name} result (from the earlier search \"{entry.query}\" in this run, "
+            f"no new call made):")
+
+
+def _wait_seconds(config):
+    """How long to wait for a matching in-flight call, never past the run's deadline"""
+    budget = current_budget()
+    if budget is None:
+        return config["wait_seconds"]
+    return min(config["wait_seconds"], budget.remaining_seconds())
+
+
+def _note_sources(run, tool_name, observation):
+    """Record where an observation came from for the calling agent's claims"""
+    if not isinstance(observation, str) or observation.startswith(UNCACHEABLE_PREFIXES):
+        return
+    sources = [tool_name] if tool_name in ("wikipedia", "arxiv") else []
+    sources += list(dict.fromkeys(URL_PATTERN.findall(observation)))[:MAX_NOTED_SOURCES]
+    run.note_sources(current_agent(), sources)
+
+
+def memoized(search_func, tool_name, present=None):
+    """Wrap a tool function so repeated or overlapping queries within a run reuse the first result.
+
+    The memo holds the raw backend result. `present(query, raw)` (e.g.
+    filter_observation) runs on every call, cached or not, so each caller's
+    copy is reranked for its own query and deduplicated for its own scratchpad.
+    """
+    present = present or (lambda query, observation: observation)
+
+    def search(query):
+        run = current_run()
+        config = get_memo_config()
+        if run is None or not config["enabled"]:
+            return present(query, search_func(query))
+
+        memo = memo_for(run)
+        entry, is_new = memo.claim(tool_name, query)
+        if not is_new:
+            # A concurrent call (e.g. another critic shard) may still be fetching it
+            entry.done.wait(_wait_seconds(config))
+            if entry.observation is not None:
+                memo.record_saved(tool_name)
+                _note_sources(run, tool_name, entry.observation)
+                observation = present(query, entry.observation)
+                return f"{_cached_note(tool_name, entry)}\n{observation}"
+            return present(query, search_func(query))
+
+        observation = None
+        try:
+            observation = search_func(query)
+        finally:
+            memo.fill(tool_name, entry, observation)
+        _note_sources(run, tool_name, observation)
+        return present(query, observation)
+    return search
@@ -1,23 +1,60 @@
 from langchain_core.tools import Tool
+from http_pool import get_http_client
+from circuit_breaker import get_breaker, OPEN
+from corpus import local_first
+from observation_filter import filter_observation
+from tool_memo import memoized
+from budget import current_budget, request_timeout
 import os
+import threading
 import time
+import xml.etree.ElementTree as ET
+
+TAVILY_HOST = "api.tavily.com"
+WIKIPEDIA_HOST = "en.wikipedia.org"
+ARXIV_HOST = "export.arxiv.org"
+
+# Tool calls are skipped once less than this much of the run budget is left
+MIN_TOOL_CALL_SECONDS = 3
+
+_tool_cache = {}
+_tool_cache_lock = threading.Lock()
+
+def unavailable_observation(tool_name, breaker):
+    """Immediate observation returned while a tool's circuit is open"""
+    return (f"⚠️ {tool_name} is currently unavailable (circuit open, retry in "
+            f"{breaker.retry_in():.0f}s). Use a different tool or your own knowledge.")
 
 def safe_search_wrapper(search_func, tool_name):
     """Wrapper to add retry logic and error handling to search tools"""
+    breaker = get_breaker(f"tool:{tool_name}")
+
     def wrapped_search(query, max_retries=2):
+        budget = current_budget()
+        if budget is not None and (budget.exhausted() or not budget.can_afford(MIN_TOOL_CALL_SECONDS)):
+            return (f"⏱️ {tool_name} skipped: the research time budget is nearly used up. "
+                    f"Answer with the information you already have.")
+        if not breaker.allow_request():
+            return unavailable_observation(tool_name, breaker)
         for attempt in range(max_retries):
             try:
                 if attempt > 0:
+                    if budget is not None and not budget.can_afford(2 + MIN_TOOL_CALL_SECONDS):
+                        break
                     time.sleep(2)  
                 result = search_func(query)
+                breaker.record_success()
                 return result
             except Exception as e:
                 error_msg = str(e).lower()
+                breaker.record_failure(e)
+                if breaker.state == OPEN:
+                    return unavailable_observation(tool_name, breaker)
                 if attempt < max_retries - 1:
                     if any(keyword in error_msg for keyword in ["connection", "timeout", "network"]):
                         print(f"🔄 {tool_name} connection issue, retrying...")
                         continue
-                    elif "rate limit" in error_msg:
+                    elif "rate limit" in error_msg and (budget is None or budget.can_afford(5 + MIN_TOOL_CALL_SECONDS)):
                         print(f"⏳ {tool_name} rate limit, waiting...")
                         time.sleep(5)
                         continue
@@ -29,85 +66,128 @@ def safe_search_wrapper(search_func, tool_name):
     
     return wrapped_search
 
+def tavily_search(query, api_key, max_results=3):
+    """Tavily search over the pooled HTTP client"""
+    client = get_http_client(TAVILY_HOST)
+    response = client.post(
+        f"https://{TAVILY_HOST}/search",
+        json={"api_key": api_key, "query": query, "max_results": max_results},
+        timeout=request_timeout(30)
+    )
+    if response.status_code == 429:
+        raise Exception("Tavily rate limit exceeded")
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    return str([{"url": r.get("url"), "content": r.get("content")} for r in results])
+
+def wikipedia_search(query, top_k_results=2, doc_content_chars_max=4000):
+    """Wikipedia page summaries over the pooled HTTP client"""
+    client = get_http_client(WIKIPEDIA_HOST)
+    response = client.get(
+        f"https://{WIKIPEDIA_HOST}/w/api.php",
+        params={
+            "action": "query",
+            "format": "json",
+            "generator": "search",
+            "gsrsearch": query[:300],
+            "gsrlimit": top_k_results,
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+        },
+        timeout=request_timeout(30)
+    )
+    response.raise_for_status()
+    pages = response.json().get("query", {}).get("pages", {})
+    pages = sorted(pages.values(), key=lambda page: page.get("index", 0))
+    summaries = [
+        f"Page: {page['title']}\nSummary: {page.get('extract', '')}"
+        for page in pages if page.get("extract")
+    ]
+    if not summaries:
+        return "No good Wikipedia Search Result was found"
+    return "\n\n".join(summaries)[:doc_content_chars_max]
+
+def arxiv_search(query, top_k_results=2, doc_content_chars_max=4000):
+    """arXiv paper summaries over the pooled HTTP client"""
+    client = get_http_client(ARXIV_HOST)
+    response = client.get(
+        f"https://{ARXIV_HOST}/api/query",
+        params={"search_query": f"all:{query[:300]}", "max_results": top_k_results},
+        timeout=request_timeout(30)
+    )
+    response.raise_for_status()
+    ns = {"atom": "http://www.w3.org/2005/Atom"}
+    root = ET.fromstring(response.text)
+    docs = []
+    for entry in root.findall("atom:entry", ns):
+        title = " ".join((entry.findtext("atom:title", "", ns)).split())
+        summary = " ".join((entry.findtext("atom:summary", "", ns)).split())
+        published = (entry.findtext("atom:published", "", ns))[:10]
+        authors = ", ".join(a.findtext("atom:name", "", ns) for a in entry.findall("atom:author", ns))
+        docs.append(f"Published: {published}\nTitle: {title}\nAuthors: {authors}\nSummary: {summary}")
+    if not docs:
+        return "No good Arxiv Result was found"
+    return "\n\n".join(docs)[:doc_content_chars_max]
+
+def _cached_tool(name, factory):
+    """Tools are stateless, so one instance per backend is shared process-wide"""
+    with _tool_cache_lock:
+        if name not in _tool_cache:
+            _tool_cache[name] = factory()
+        return _tool_cache[name]
+
 def get_tools(agent_type):
     """Get tools for different agent types with improved error handling"""
     tools = []
-    
-    
+
+
     tavily_api_key = os.getenv("TAVILY_API_KEY")
     if tavily_api_key:
         try:
-            
-            try:
-                from langchain_tavily import TavilySearchResults
-                print("✅ Using new langchain_tavily package")
-            except ImportError:
-                from langchain_community.tools.tavily_search import TavilySearchResults
-                print("⚠️ Using legacy langchain_community package")
-            
-            tavily_search = TavilySearchResults(
-                api_key=tavily_api_key,
-                max_results=3,
-                description="Search web for latest technical information"
-            )
-            
-            
-            safe_tavily = safe_search_wrapper(tavily_search.run, "Tavily")
-            tavily_tool = Tool(
+            tavily_tool = _cached_tool("web_search", lambda: Tool(
                 name="web_search",
-                func=safe_tavily,
+                func=memoized(safe_search_wrapper(lambda q: tavily_search(q, tavily_api_key), "Tavily"), "web_search",
+                              filter_observation),
                 description="Search the web for current technical information and recent developments"
-            )
+            ))
             tools.append(tavily_tool)
             print("✅ Tavily search tool initialized")
-            
+
         except Exception as e:
             print(f"⚠️ Tavily tool initialization failed: {e}")
     else:
         print("⚠️ TAVILY_API_KEY not found")
-    
-    
+
+
     try:
-        from langchain_community.utilities import WikipediaAPIWrapper
-        
-        wikipedia = WikipediaAPIWrapper(
-            top_k_results=2,
-            doc_content_chars_max=4000
-        )
-        
-        safe_wikipedia = safe_search_wrapper(wikipedia.run, "Wikipedia")
-        wikipedia_tool = Tool(
+        wikipedia_tool = _cached_tool("wikipedia", lambda: Tool(
             name="wikipedia",
-            func=safe_wikipedia,
+            func=memoized(local_first(safe_search_wrapper(wikipedia_search, "Wikipedia"), "wikipedia"), "wikipedia",
+                          filter_observation),
             description="Access encyclopedic knowledge about technical concepts and technologies"
-        )
+        ))
         tools.append(wikipedia_tool)
         print("✅ Wikipedia tool initialized")
-        
+
     except Exception as e:
         print(f"⚠️ Wikipedia tool initialization failed: {e}")
-    
-    
+
+
     if agent_type == "researcher":
         try:
-            from langchain_community.utilities.arxiv import ArxivAPIWrapper
-            
-            arxiv = ArxivAPIWrapper(
-                top_k_results=2,
-                doc_content_chars_max=4000
-            )
-            
-            safe_arxiv = safe_search_wrapper(arxiv.run, "ArXiv")
-            arxiv_tool = Tool(
+            arxiv_tool = _cached_tool("arxiv", lambda: Tool(
                 name="arxiv",
-                func=safe_arxiv,
+                func=memoized(local_first(safe_search_wrapper(arxiv_search, "ArXiv"), "arxiv"), "arxiv",
+                              filter_observation),
                 description="Access academic papers and research about technical topics"
-            )
+            ))
             tools.append(arxiv_tool)
             print("✅ ArXiv tool initialized")
-            
+
         except Exception as e:
             print(f"⚠️ ArXiv tool initialization failed: {e}")
-    
+
     print(f"📋 Initialized {len(tools)} tools for {agent_type} agent")
-    return tools
\ No newline at end of file
+    return tools
@@ -1,12 +1,105 @@
 import sqlite3
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
 import threading
+import time
+import math
+import uuid
+import zlib
+from corpus import tokenize
 
-class ClaimTracker:
+# How long a claim stays fresh, by the kind of source it came from
+CLAIM_TTL_DAYS = {
+    "academic": 365,
+    "encyclopedia": 180,
+    "agent": 30,
+    "web": 14,
+}
+
+URL_PATTERN = re.compile(r"https?://[^\s)\]>'\",]+|www\.[^\s)\]>'\",]+")
+ACADEMIC_MARKERS = ("arxiv", "doi.org")
+
+def claim_source_type(claim: str, sources: str = ""):
+    """Rough source category of a stored claim, used for freshness decisions.
+    
+    When a claim cites several kinds of source the shortest-lived one wins,
+    so it is never treated as fresh for longer than its weakest source.
+    """
+    text = f"{claim} {sources}".lower()
+    types = set()
+    if any(marker in text for marker in ACADEMIC_MARKERS):
+        types.add("academic")
+    if "wikipedia" in text:
+        types.add("encyclopedia")
+    if any(not any(marker in url for marker in ACADEMIC_MARKERS + ("wikipedia",))
+           for url in URL_PATTERN.findall(text)):
+        types.add("web")
+    if not types:
+        return "agent"
+    return min(types, key=CLAIM_TTL_DAYS.get)
+
+def claim_sources(claim: str, tool_sources=None, default="Researcher Agent"):
+    """Sources for one claim: URLs it cites itself, else what the agent's tools returned"""
+    urls = URL_PATTERN.findall(claim)
+    if urls:
+        return ", ".join(dict.fromkeys(urls))
+    if tool_sources:
+        return ", ".join(tool_sources)
+    return default
+
+def split_sources(sources):
+    """Individual sources of a stored `sources` value (claim_sources joins them with ', ')"""
+    return list(dict.fromkeys(part.strip() for part in (sources or "").split(", ") if part.strip()))
+
+def query_hash(query: str):
+    """Stable hash of a normalized query, used to group runs of the same question"""
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+
+class TimedLock:
+    """threading.Lock that keeps count of how long callers waited to acquire it"""
+    
     def __init__(self):
-        self.lock = threading.Lock()
-        self.conn = sqlite3.connect('research.db', check_same_thread=False)
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    def __enter__(self):
+        started = time.perf_counter()
+        self._lock.acquire()
+        waited = time.perf_counter() - started
+        # Updated while holding the lock, so no extra synchronization is needed
+        self.acquisitions += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._lock.release()
+    
+    def stats(self):
+        with self:
+            return {
+                "acquisitions": self.acquisitions,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+class ClaimTracker:
+    def __init__(self, db_path=None):
+        self.lock = TimedLock()
+        busy_timeout_ms = int(os.getenv("CLAIM_DB_BUSY_TIMEOUT_MS", 5000))
+        self.conn = sqlite3.connect(db_path or os.getenv("CLAIM_DB_PATH", "research.db"),
+                                    check_same_thread=False, timeout=busy_timeout_ms / 1000)
+        # Several processes (service workers, the app) share one database file:
+        # WAL lets readers run alongside a writer, and writers wait instead of failing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+        self._retention_stop = None
         self._create_table()
     
     def _create_table(self):
@@ -18,8 +111,153 @@ class ClaimTracker:
                 status TEXT DEFAULT 'unverified',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_sources ON claims (sources)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_created_at ON claims (created_at)")
+            self._create_status_counters()
+            self._create_run_tables()
+            self._create_search_index()
             self.conn.commit()
     
+    def _create_run_tables(self):
+        """Run tagging on claims, the runs registry and the compacted archive"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(claims)")}
+        if "run_id" not in columns:
+            self.conn.execute("ALTER TABLE claims ADD COLUMN run_id TEXT")
+        if "query_hash" not in columns:
+            self.conn.execute("ALTER TABLE claims ADD COLUMN query_hash TEXT")
+        # Typed fields for claims recorded through the structured researcher output
+        for column in ("subject", "comparison", "value", "source_url"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE claims ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_run_status ON claims (run_id, status)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_query_hash ON claims (query_hash)")
+        
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            query_hash TEXT,
+            query TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            archived_at TIMESTAMP
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at)")
+        
+        # One row per archived batch: the batch's claims as zlib-compressed JSON
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS claims_archive (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT,
+            query_hash TEXT,
+            claim_count INTEGER,
+            payload BLOB,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_archive_run ON claims_archive (run_id)")
+        
+        # Claims a run reused from earlier runs, referenced rather than copied
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS run_claim_refs (
+            run_id TEXT,
+            claim_id INTEGER,
+            PRIMARY KEY (run_id, claim_id)
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_run_claim_refs_claim ON run_claim_refs (claim_id)")
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_claims_drop_refs AFTER DELETE ON claims
+            BEGIN
+                DELETE FROM run_claim_refs WHERE claim_id = OLD.id;
+            END
+        ''')
+        self._create_source_links()
+    
+    def _create_source_links(self):
+        """One row per (claim, source), so filtering by a single source uses an index
+        even when a claim cites several"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'claim_source_links'"
+        ).fetchone()
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS claim_source_links (
+            source TEXT,
+            claim_id INTEGER,
+            PRIMARY KEY (source, claim_id)
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_claim_source_links_claim ON claim_source_links (claim_id)")
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_claims_drop_source_links AFTER DELETE ON claims
+            BEGIN
+                DELETE FROM claim_source_links WHERE claim_id = OLD.id;
+            END
+        ''')
+        if not exists:
+            # One-off backfill; INSERT OR IGNORE keeps it safe if two processes race here
+            after_id = 0
+            while True:
+                rows = self.conn.execute(
+                    "SELECT id, sources FROM claims WHERE id > ? ORDER BY id LIMIT 1000", (after_id,)
+                ).fetchall()
+                if not rows:
+                    break
+                for claim_id, sources in rows:
+                    self._link_sources(claim_id, sources)
+                after_id = rows[-1][0]
+    
+    def _link_sources(self, claim_id, sources):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO claim_source_links (source, claim_id) VALUES (?, ?)",
+            [(source, claim_id) for source in split_sources(sources)]
+        )
+    
+    def _create_status_counters(self):
+        """Materialized per-status counts, kept current by triggers.
+        
+        The existence check, backfill and triggers run in one BEGIN IMMEDIATE
+        transaction: another process opening the same database waits for the
+        write lock, then sees the table and triggers already in place, so
+        claims written in between are never counted twice or missed.
+        """
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'claim_status_counts'"
+            ).fetchone()
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS claim_status_counts (
+                status TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )''')
+            if not exists:
+                # One-off backfill for databases created before the counters existed
+                self.conn.execute("""
+                    INSERT INTO claim_status_counts (status, count)
+                    SELECT status, COUNT(*) FROM claims GROUP BY status
+                """)
+            
+            # Separate statements: executescript() would commit the open transaction
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_claims_count_insert AFTER INSERT ON claims
+                BEGIN
+                    INSERT OR IGNORE INTO claim_status_counts (status, count) VALUES (NEW.status, 0);
+                    UPDATE claim_status_counts SET count = count + 1 WHERE status = NEW.status;
+                END
+            ''')
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_claims_count_delete AFTER DELETE ON claims
+                BEGIN
+                    UPDATE claim_status_counts SET count = count - 1 WHERE status = OLD.status;
+                END
+            ''')
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_claims_count_update AFTER UPDATE OF status ON claims
+                WHEN OLD.status IS NOT NEW.status
+                BEGIN
+                    UPDATE claim_status_counts SET count = count - 1 WHERE status = OLD.status;
+                    INSERT OR IGNORE INTO claim_status_counts (status, count) VALUES (NEW.status, 0);
+                    UPDATE claim_status_counts SET count = count + 1 WHERE status = NEW.status;
+                END
+            ''')
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+    
     def extract_claims(self, text: str):
         """Improved claim extraction from agent output"""
         if not text:
@@ -39,29 +277,206 @@ class ClaimTracker:
         
         return [claim.strip() for claim in claims if len(claim) > 15]
     
-    def add_claims(self, claims: list, sources: str):
+    def _create_search_index(self):
+        """FTS5 index over claim text for related-claim lookup (LIKE fallback without FTS5)"""
+        try:
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'claims_fts'"
+            ).fetchone()
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS claims_fts USING fts5(claim, content='claims', content_rowid='id')"
+            )
+            self.conn.executescript('''
+                CREATE TRIGGER IF NOT EXISTS trg_claims_fts_insert AFTER INSERT ON claims
+                BEGIN
+                    INSERT INTO claims_fts (rowid, claim) VALUES (NEW.id, NEW.claim);
+                END;
+                
+                CREATE TRIGGER IF NOT EXISTS trg_claims_fts_delete AFTER DELETE ON claims
+                BEGIN
+                    INSERT INTO claims_fts (claims_fts, rowid, claim) VALUES ('delete', OLD.id, OLD.claim);
+                END;
+                
+                CREATE TRIGGER IF NOT EXISTS trg_claims_fts_update AFTER UPDATE OF claim ON claims
+                BEGIN
+                    INSERT INTO claims_fts (claims_fts, rowid, claim) VALUES ('delete', OLD.id, OLD.claim);
+                    INSERT INTO claims_fts (rowid, claim) VALUES (NEW.id, NEW.claim);
+                END;
+            ''')
+            if not exists:
+                self.conn.execute("INSERT INTO claims_fts (claims_fts) VALUES ('rebuild')")
+            self.has_fts = True
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 unavailable, related-claim search will use LIKE: {e}")
+            self.has_fts = False
+    
+    def find_related_claims(self, query: str, limit=40, exclude_run_id=None):
+        """Stored claims relevant to a query: earlier runs of the same query plus
+        full-text matches covering enough of the query's terms"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        min_matches = max(1, math.ceil(len(terms) * 0.25))
+        columns = "id, claim, sources, status, created_at, run_id, query_hash"
+        
+        with self.lock:
+            try:
+                rows = self.conn.execute(
+                    f"SELECT {columns} FROM claims WHERE query_hash = ? AND status != 'superseded' "
+                    f"ORDER BY id DESC LIMIT ?",
+                    (query_hash(query), limit)
+                ).fetchall()
+                if terms:
+                    if self.has_fts:
+                        match = " OR ".join(f'"{term.replace(chr(34), "")}"' for term in terms)
+                        rows += self.conn.execute(
+                            f"SELECT {columns} FROM claims WHERE status != 'superseded' AND id IN ("
+                            f"SELECT rowid FROM claims_fts WHERE claims_fts MATCH ? ORDER BY rank LIMIT ?)",
+                            (match, limit * 4)
+                        ).fetchall()
+                    else:
+                        like = " OR ".join("claim LIKE ?" for _ in terms)
+                        rows += self.conn.execute(
+                            f"SELECT {columns} FROM claims WHERE status != 'superseded' AND ({like}) "
+                            f"ORDER BY id DESC LIMIT ?",
+                            [f"%{term}%" for term in terms] + [limit * 4]
+                        ).fetchall()
+            except Exception as e:
+                print(f"Error finding related claims: {e}")
+                return []
+        
+        q_hash = query_hash(query)
+        related, seen = [], set()
+        for row in rows:
+            claim = self._row_to_claim(row)
+            key = " ".join(claim["claim"].lower().split())
+            if key in seen or claim["run_id"] == exclude_run_id:
+                continue
+            if claim["query_hash"] != q_hash:
+                claim_terms = set(tokenize(claim["claim"]))
+                if sum(1 for term in terms if term in claim_terms) < min_matches:
+                    continue
+            seen.add(key)
+            related.append(claim)
+            if len(related) >= limit:
+                break
+        return related
+    
+    def classify_freshness(self, claims, now=None):
+        """Split claims into (fresh, stale) by age against their source type's TTL"""
+        now = now or datetime.utcnow()
+        fresh, stale = [], []
+        for claim in claims:
+            source_type = claim_source_type(claim["claim"], claim["sources"] or "")
+            try:
+                created = datetime.strptime(str(claim["created_at"])[:19], "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                stale.append(claim)
+                continue
+            if now - created <= timedelta(days=CLAIM_TTL_DAYS[source_type]):
+                fresh.append(claim)
+            else:
+                stale.append(claim)
+        return fresh, stale
+    
+    def reuse_claims(self, claims, run_id):
+        """Attach fresh claims from earlier runs to a run by reference (no copied rows)"""
+        if not claims:
+            return
+        with self.lock:
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO run_claim_refs (run_id, claim_id) VALUES (?, ?)",
+                    [(run_id, c["id"]) for c in claims]
+                )
+                self.conn.commit()
+            except Exception as e:
+                print(f"Error reusing claims: {e}")
+    
+    def supersede_claims(self, claims):
+        """Mark stale claims that a newer run has re-researched, so they are not reused again"""
+        if not claims:
+            return
+        with self.lock:
+            try:
+                self.conn.executemany(
+                    "UPDATE claims SET status = 'superseded' WHERE id = ?",
+                    [(c["id"],) for c in claims]
+                )
+                self.conn.commit()
+            except Exception as e:
+                print(f"Error superseding claims: {e}")
+    
+    def start_run(self, query: str):
+        """Register a pipeline run and return its run_id"""
+        run_id = uuid.uuid4().hex
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, query_hash, query) VALUES (?, ?, ?)",
+                (run_id, query_hash(query), query)
+            )
+            self.conn.commit()
+        return run_id
+    
+    def add_claims(self, claims: list, sources, run_id=None):
+        """Store claims; `sources` is one string for all of them or one per claim"""
         if not claims:
             return
+        if isinstance(sources, str):
+            sources = [sources] * len(claims)
         
         with self.lock:
             try:
-                for claim in claims:
-                    self.conn.execute(
-                        "INSERT INTO claims (claim, sources) VALUES (?, ?)",
-                        (claim, sources)
+                for claim, claim_source in zip(claims, sources):
+                    cursor = self.conn.execute(
+                        """INSERT INTO claims (claim, sources, run_id, query_hash)
+                           VALUES (?, ?, ?, (SELECT query_hash FROM runs WHERE run_id = ?))""",
+                        (claim, claim_source, run_id, run_id)
                     )
+                    self._link_sources(cursor.lastrowid, claim_source)
                 self.conn.commit()
             except Exception as e:
                 print(f"Error adding claims: {e}")
     
-    def get_verification_report(self):
+    def add_structured_claims(self, claims: list, sources: str, run_id=None):
+        """Store typed claims (subject, comparison, value, source_url) without any text parsing"""
+        if not claims:
+            return
+        
         with self.lock:
             try:
-                cursor = self.conn.execute("""
-                    SELECT status, COUNT(*) 
-                    FROM claims 
-                    GROUP BY status
-                """)
+                for claim in claims:
+                    text = f"{claim['subject']} — {claim['comparison']}: {claim['value']}"
+                    claim_source = claim.get("source_url") or sources
+                    cursor = self.conn.execute(
+                        """INSERT INTO claims (claim, sources, run_id, query_hash, subject, comparison, value, source_url)
+                           VALUES (?, ?, ?, (SELECT query_hash FROM runs WHERE run_id = ?), ?, ?, ?, ?)""",
+                        (text, claim_source, run_id, run_id,
+                         claim["subject"], claim["comparison"], claim["value"], claim.get("source_url"))
+                    )
+                    self._link_sources(cursor.lastrowid, claim_source)
+                self.conn.commit()
+            except Exception as e:
+                print(f"Error adding structured claims: {e}")
+    
+    def get_verification_report(self, run_id=None):
+        """Status counts for one run (via the run/status index) or across all claims"""
+        with self.lock:
+            try:
+                if run_id is not None:
+                    cursor = self.conn.execute("""
+                        SELECT status, COUNT(*) FROM (
+                            SELECT status FROM claims WHERE run_id = ?
+                            UNION ALL
+                            SELECT c.status FROM run_claim_refs r JOIN claims c ON c.id = r.claim_id
+                            WHERE r.run_id = ?
+                        )
+                        GROUP BY status
+                    """, (run_id, run_id))
+                else:
+                    cursor = self.conn.execute("""
+                        SELECT status, count
+                        FROM claim_status_counts
+                        WHERE count > 0
+                    """)
                 result = {row[0]: row[1] for row in cursor.fetchall()}
                 
                 
@@ -73,7 +488,240 @@ class ClaimTracker:
                 print(f"Error getting verification report: {e}")
                 return {'unverified': 0}
     
+    def _claim_filters(self, status=None, source=None, since=None, until=None, run_id=None):
+        clauses, params = [], []
+        if run_id is not None:
+            clauses.append("(run_id = ? OR id IN (SELECT claim_id FROM run_claim_refs WHERE run_id = ?))")
+            params.extend([run_id, run_id])
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if source is not None:
+            # Matches claims citing `source` among others, not only an exact `sources` value
+            clauses.append("id IN (SELECT claim_id FROM claim_source_links WHERE source = ?)")
+            params.append(source)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(self._as_timestamp(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(self._as_timestamp(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+    
+    @staticmethod
+    def _as_timestamp(value):
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+        return value
+    
+    @staticmethod
+    def _row_to_claim(row):
+        return {
+            "id": row[0],
+            "claim": row[1],
+            "sources": row[2],
+            "status": row[3],
+            "created_at": row[4],
+            "run_id": row[5],
+            "query_hash": row[6],
+        }
+    
+    def query_claims(self, status=None, source=None, since=None, until=None,
+                     limit=50, after_id=None, run_id=None):
+        """One page of claims, newest first, filtered by status/source/date.
+        
+        Pagination is keyset-based: pass the last returned id as ``after_id``
+        to fetch the next page without OFFSET scans.
+        """
+        where, params = self._claim_filters(status, source, since, until, run_id)
+        if after_id is not None:
+            where = f"{where} AND id < ?" if where else "WHERE id < ?"
+            params.append(after_id)
+        with self.lock:
+            try:
+                cursor = self.conn.execute(
+                    f"SELECT id, claim, sources, status, created_at, run_id, query_hash FROM claims {where} "
+                    f"ORDER BY id DESC LIMIT ?",
+                    params + [limit]
+                )
+                return [self._row_to_claim(row) for row in cursor.fetchall()]
+            except Exception as e:
+                print(f"Error querying claims: {e}")
+                return []
+    
+    def count_claims(self, status=None, source=None, since=None, until=None, run_id=None):
+        """Number of claims matching the filters (status-only counts are O(1))"""
+        if status is not None and source is None and since is None and until is None and run_id is None:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT count FROM claim_status_counts WHERE status = ?", (status,)
+                ).fetchone()
+                return row[0] if row else 0
+        where, params = self._claim_filters(status, source, since, until, run_id)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM claims {where}", params).fetchone()[0]
+    
+    def iter_claims(self, status=None, source=None, since=None, until=None, batch_size=500, run_id=None):
+        """Stream every matching claim in pages, holding the lock only per page"""
+        after_id = None
+        while True:
+            page = self.query_claims(status, source, since, until, limit=batch_size,
+                                     after_id=after_id, run_id=run_id)
+            if not page:
+                return
+            yield from page
+            after_id = page[-1]["id"]
+    
+    def _expired_runs(self, max_age_days=None, max_runs=None):
+        expired = set()
+        with self.lock:
+            if max_age_days is not None:
+                cutoff = self._as_timestamp(datetime.utcnow() - timedelta(days=max_age_days))
+                expired.update(row[0] for row in self.conn.execute(
+                    "SELECT run_id FROM runs WHERE archived_at IS NULL AND created_at < ?", (cutoff,)
+                ))
+            if max_runs is not None:
+                expired.update(row[0] for row in self.conn.execute(
+                    "SELECT run_id FROM runs WHERE archived_at IS NULL "
+                    "ORDER BY created_at DESC, rowid DESC LIMIT -1 OFFSET ?", (max_runs,)
+                ))
+        return sorted(expired)
+    
+    def _compact_batch(self, where, params, archive, batch_size):
+        """Move one batch of matching claims into the archive; returns rows moved.
+        
+        Claims a retained run still references are left in place; they are
+        compacted by a later pass once the referencing run expires too.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, claim, sources, status, created_at, run_id, query_hash FROM claims "
+                f"WHERE ({where}) AND id NOT IN (SELECT claim_id FROM run_claim_refs) LIMIT ?",
+                params + [batch_size]
+            ).fetchall()
+            if not rows:
+                return 0
+            if archive:
+                by_run = {}
+                for row in rows:
+                    by_run.setdefault((row[5], row[6]), []).append(self._row_to_claim(row))
+                for (run_id, q_hash), claims in by_run.items():
+                    self.conn.execute(
+                        "INSERT INTO claims_archive (run_id, query_hash, claim_count, payload) VALUES (?, ?, ?, ?)",
+                        (run_id, q_hash, len(claims), zlib.compress(json.dumps(claims).encode()))
+                    )
+            self.conn.executemany("DELETE FROM claims WHERE id = ?", [(row[0],) for row in rows])
+            self.conn.commit()
+            return len(rows)
+    
+    def apply_retention(self, max_age_days=None, max_runs=None, archive=True,
+                        batch_size=500, vacuum_pages=1000):
+        """Archive (or drop) claims of runs past the retention policy, then vacuum.
+        
+        Work happens in small batches that each take the lock briefly, so it can
+        run in the background while agents keep writing claims.
+        """
+        moved = 0
+        expired = self._expired_runs(max_age_days, max_runs)
+        for run_id in expired:
+            with self.lock:
+                if archive:
+                    self.conn.execute("UPDATE runs SET archived_at = CURRENT_TIMESTAMP WHERE run_id = ?", (run_id,))
+                else:
+                    self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+                self.conn.execute("DELETE FROM run_claim_refs WHERE run_id = ?", (run_id,))
+                self.conn.commit()
+        
+        # Claims of every run no longer retained, including ones an earlier pass
+        # kept because a newer run was still reusing them
+        while True:
+            count = self._compact_batch(
+                "run_id IS NOT NULL AND run_id NOT IN (SELECT run_id FROM runs WHERE archived_at IS NULL)",
+                [], archive, batch_size
+            )
+            moved += count
+            if count < batch_size:
+                break
+        
+        # Claims stored before run tagging existed only age out
+        if max_age_days is not None:
+            cutoff = self._as_timestamp(datetime.utcnow() - timedelta(days=max_age_days))
+            while True:
+                count = self._compact_batch("run_id IS NULL AND created_at < ?", [cutoff], archive, batch_size)
+                moved += count
+                if count < batch_size:
+                    break
+        
+        if moved:
+            self._incremental_vacuum(vacuum_pages)
+        return {"runs_compacted": len(expired), "claims_moved": moved}
+    
+    def _incremental_vacuum(self, pages):
+        with self.lock:
+            try:
+                mode = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+                if mode != 2:
+                    # auto_vacuum can only be switched on by one full VACUUM
+                    self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    self.conn.execute("VACUUM")
+                else:
+                    self.conn.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+                self.conn.commit()
+            except Exception as e:
+                print(f"Warning: Incremental vacuum failed: {e}")
+    
+    def start_retention_worker(self, interval_seconds=3600, **policy):
+        """Apply the retention policy periodically on a daemon thread.
+        
+        Without an explicit policy, CLAIM_RETENTION_DAYS / CLAIM_RETENTION_MAX_RUNS
+        are read from the environment; with neither set, no worker is started.
+        """
+        if not policy:
+            if os.getenv("CLAIM_RETENTION_DAYS"):
+                policy["max_age_days"] = float(os.getenv("CLAIM_RETENTION_DAYS"))
+            if os.getenv("CLAIM_RETENTION_MAX_RUNS"):
+                policy["max_runs"] = int(os.getenv("CLAIM_RETENTION_MAX_RUNS"))
+        if not policy or self._retention_stop is not None:
+            return None
+        
+        self._retention_stop = threading.Event()
+        
+        def worker():
+            while not self._retention_stop.is_set():
+                try:
+                    result = self.apply_retention(**policy)
+                    if result["claims_moved"]:
+                        print(f"🗄️ Retention compacted {result['runs_compacted']} runs "
+                              f"({result['claims_moved']} claims)")
+                except Exception as e:
+                    print(f"Warning: Retention pass failed: {e}")
+                self._retention_stop.wait(interval_seconds)
+        
+        thread = threading.Thread(target=worker, name="claim-retention", daemon=True)
+        thread.start()
+        return thread
+    
+    def lock_stats(self):
+        """How often the connection lock was taken and how long callers waited for it"""
+        return self.lock.stats()
+    
     def close(self):
+        if self._retention_stop is not None:
+            self._retention_stop.set()
         with self.lock:
             if self.conn:
-                self.conn.close()
\ No newline at end of file
+                self.conn.close()
+
+def start_claim_retention():
+    """Run the retention policy from this process only.
+
+    Call once per deployment (the service parent or the Streamlit app), not
+    per agent set, so worker processes never compact the same database at
+    once. Returns the tracker that owns the worker, or None without a policy.
+    """
+    tracker = ClaimTracker()
+    if tracker.start_retention_worker() is None:
+        tracker.close()
+        return None
+    return tracker
@@ -1,69 +1,93 @@
 import pandas as pd
-import base64
+import json
 from io import BytesIO
 import matplotlib.pyplot as plt
+from structured_claims import render_comparison_tables
+from artifact_store import get_artifact_store
 
-def generate_verification_chart(verification_data):
-    """Generate verification status pie chart"""
-    if not verification_data:
-        return ""
+def render_verification_png(verification_data):
+    """Verification status pie chart as PNG bytes"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    
+    labels = list(verification_data.keys())
+    sizes = list(verification_data.values())
+    colors = {'verified': '#2ecc71', 'contested': '#e74c3c', 'unverified': '#f39c12'}
+    chart_colors = [colors.get(label, '#95a5a6') for label in labels]
+    
+    ax.pie(sizes, labels=labels, colors=chart_colors, autopct='%1.1f%%', startangle=90)
+    ax.set_title('Claim Verification Status')
     
-    try:
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        labels = list(verification_data.keys())
-        sizes = list(verification_data.values())
-        colors = {'verified': '#2ecc71', 'contested': '#e74c3c', 'unverified': '#f39c12'}
-        chart_colors = [colors.get(label, '#95a5a6') for label in labels]
-        
-        ax.pie(sizes, labels=labels, colors=chart_colors, autopct='%1.1f%%', startangle=90)
-        ax.set_title('Claim Verification Status')
-        
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', dpi=150)
-        buffer.seek(0)
-        
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return f"data:image/png;base64,{img_base64}"
-    except Exception as e:
-        return f"<!-- Chart generation error: {str(e)} -->"
-
-def format_report(research, critique, synthesis, verification_data):
-    """Generate full markdown report"""
-    chart_html = generate_verification_chart(verification_data)
     
-    chart_section = ""
-    if chart_html and not chart_html.startswith("<!--"):
-        chart_section = f"<img src='{chart_html}' alt='Verification Chart' style='max-width: 500px; margin: 20px 0;'>"
+    buffer = BytesIO()
+    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=150)
+    plt.close(fig)
     
-    return f"""
+    return buffer.getvalue()
+
+def report_sections(research, critique, synthesis, verification_data, structured_claims=None):
+    """Report as a sequence of sections, for the artifact store.
+
+    The chart is rendered lazily and keyed on its data, so a store that
+    already holds the same chart skips rendering it again.
+    """
+    summary = synthesis.split('##')[0] if '##' in synthesis else synthesis[:500]
+    yield {"name": "summary", "kind": "markdown", "body": f"""
 # Technical Research Report
 
 ## Executive Summary
-{synthesis.split('##')[0] if '##' in synthesis else synthesis[:500]}
+{summary}
 
 ---
-
-## Verification Status
-{chart_section}
+"""}
+    
+    if structured_claims:
+        yield {"name": "comparison", "kind": "markdown", "body": f"""
+## Comparison Table
+{render_comparison_tables(structured_claims)}
+"""}
+    
+    yield {"name": "verification_heading", "kind": "markdown", "body": "## Verification Status\n"}
+    
+    if verification_data:
+        def render():
+            try:
+                return render_verification_png(verification_data)
+            except Exception as e:
+                print(f"Chart generation error: {e}")
+                return None
+        
+        yield {
+            "name": "verification_chart",
+            "kind": "image",
+            "media_type": "image/png",
+            "alt": "Verification Chart",
+            "cache_key": json.dumps(verification_data, sort_keys=True, default=str),
+            "render": render,
+        }
+    
+    yield {"name": "verification_summary", "kind": "markdown", "body": f"""
 
 **Verification Summary:**
 {verification_data if verification_data else 'No verification data available'}
 
-## Detailed Analysis
+"""}
+    yield {"name": "research", "kind": "markdown", "body": f"""## Detailed Analysis
 ### Research Findings
 {research}
 
-### Critical Review
+"""}
+    yield {"name": "critique", "kind": "markdown", "body": f"""### Critical Review
 {critique}
 
-### Full Synthesis
+"""}
+    yield {"name": "synthesis", "kind": "markdown", "body": f"""### Full Synthesis
 {synthesis}
 
 ---
 *Report generated by Multi-Agent Research System*
-"""
\ No newline at end of file
+"""}
+
+def store_report(research, critique, synthesis, verification_data, structured_claims=None, store=None):
+    """Write the report section by section into the artifact store and return its id"""
+    store = store or get_artifact_store()
+    return store.put_report(report_sections(research, critique, synthesis, verification_data, structured_claims))